@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -11,9 +12,39 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
+    # LLM
+    LLM_BACKEND: str = "gemini"         # "gemini", or "fake" for offline load testing
+
     # Gemini
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = "gemini-3-flash-preview"
+    LLM_HISTORY_MESSAGES: int = 10      # conversation messages sent to the LLM (5 exchanges)
+    LLM_CHAT_CACHE_SIZE: int = 1000     # live per-session chat objects kept in memory
+    TOOL_LOOP_MAX_STEPS: int = 4        # tool-call hops allowed per user message
+    TOOL_LOOP_BUDGET_SECONDS: float = 15.0  # wall-clock budget for the whole tool loop
+    LLM_COALESCE_GUEST_REQUESTS: bool = True  # share one LLM call across identical concurrent guest requests
+
+    # LLM rate governor (quotas are per worker process)
+    GEMINI_RPM: int = 60                        # requests per minute
+    GEMINI_TPM: int = 1_000_000                 # tokens per minute (input + output)
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = 400        # reserved per call for the reply
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 5.0      # max wait for quota before failing fast
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5      # consecutive failures before the breaker opens
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Thread pools (blocking work runs off the event loop)
+    BLOCKING_EXECUTOR_WORKERS: int = 8          # RAG queries, DB tool calls, audit writes
+    LLM_EXECUTOR_WORKERS: int = 16              # LLM backend calls (network-bound)
+
+    # Fake LLM backend (LLM_BACKEND=fake)
+    FAKE_LLM_SCRIPT: str = ""                   # JSON rules file; built-in rules if empty
+    FAKE_LLM_LATENCY_MS: float = 300.0
+    FAKE_LLM_JITTER_MS: float = 100.0
+    FAKE_LLM_ERROR_RATE: float = 0.0            # fraction of calls that fail with a 429-style error
+    FAKE_LLM_SEED: Optional[int] = None
 
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -27,12 +58,54 @@ class Settings(BaseSettings):
 
     # ChromaDB
     CHROMA_PERSIST_DIR: str = str(BASE_DIR / "chroma_db")
+    FAQ_WATCH_INTERVAL_SECONDS: float = 10.0    # poll FAQ_DIR and hot-reload changes; 0 disables
+    RAG_VECTOR_BACKEND: str = "chroma"  # "chroma" (HNSW) or "numpy" (brute force, best for small corpora)
+    RAG_CHUNK_MAX_TOKENS: int = 200     # per chunk, incl. heading path (embedding model window is 256)
+    RAG_CHUNK_OVERLAP_TOKENS: int = 30  # repeated between consecutive chunks of a long section
+    RAG_EMBED_BATCH_SIZE: int = 256     # chunks embedded and written per batch during ingestion
+    RAG_INGEST_WORKERS: int = 0         # processes that parse and chunk documents; 0 = one per CPU
+    RAG_INGEST_PARALLEL_MIN_FILES: int = 64  # fewer changed files are chunked in-process (pool start-up costs ~0.5 s)
+    RAG_QUERY_CACHE_SIZE: int = 2048    # cached query embeddings (normalised query text → vector)
+    RAG_HYBRID_CANDIDATES: int = 10     # candidates taken from each of BM25 and vector search
+    RAG_RRF_K: int = 60                 # reciprocal rank fusion constant
+    RAG_LEXICAL_FAST_PATH: bool = True  # answer decisive keyword queries from BM25 alone
+    RAG_LEXICAL_MAX_TERMS: int = 4      # only queries this short (after stopwords) qualify
+    RAG_LEXICAL_MIN_SCORE: float = 3.5  # minimum BM25 score of the best hit
+    RAG_LEXICAL_MARGIN: float = 1.5     # best hit must beat the runner-up by this factor
+    RAG_INTENT_GATING: bool = True      # skip retrieval for chit-chat, OTPs and verified users' tool requests
+    RAG_MAX_CONTEXT_CHUNKS: int = 6     # most FAQ chunks ever put in one prompt
+    RAG_MIN_SCORE: float = 0.3          # drop chunks less relevant than this (cosine, or share of the best BM25 score)
+    RAG_ELBOW_MIN_GAP: float = 0.1      # cut the ranking at its largest score drop when at least this big
+    RAG_CONTEXT_MAX_TOKENS: int = 600   # FAQ context token budget per request
+
+    # Guest answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 500
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.95   # min cosine similarity of query embeddings for a hit
+
+    # Voice turn latency budget (Twilio abandons the webhook after 15 s)
+    VOICE_TURN_BUDGET_SECONDS: float = 10.0
+    DEADLINE_RAG_MAX_SECONDS: float = 1.5       # longest RAG may run within a budgeted request
+    DEADLINE_LLM_RESERVE_SECONDS: float = 3.0   # skip RAG / tools rather than leave the LLM less than this
+    DEADLINE_SHORT_HISTORY_SECONDS: float = 5.0 # below this much budget, send only the last exchange
+    DEADLINE_WRITE_TOOL_SECONDS: float = 2.0    # expected cost of a write tool; not started with less budget left
+    DEADLINE_HOLDING_MARGIN_SECONDS: float = 0.5  # the holding answer goes out this long before the deadline
 
     # Session
     SESSION_TIMEOUT_MINUTES: int = 30
+    SESSION_BACKEND: str = "memory"     # "memory" (single worker) or "sqlite" (shared by all workers on the host)
+    SESSION_DB_PATH: str = str(BASE_DIR / "sessions.db")  # SESSION_BACKEND=sqlite; local disk only (WAL)
+    VOICE_SESSION_TTL_SECONDS: int = 3600   # idle voice calls are forgotten after this
+    OTP_TTL_SECONDS: int = 300
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 30.0  # purge expired sessions, calls and OTPs; 0 disables
+
+    # Admin API (disabled when empty; send as X-Admin-Key)
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
 
     # Paths
     FAQ_DIR: str = str(Path(__file__).resolve().parent / "data" / "faqs")
+    PRIVATE_DOCS_DIR: str = str(Path(__file__).resolve().parent / "data" / "private_docs")  # registered-only; optional
     FRONTEND_DIR: str = str(BASE_DIR / "frontend")
 
     class Config:
@@ -1,8 +1,13 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 
 from app.config import settings
@@ -12,29 +17,59 @@ from app.services.rag_service import rag_service
 from app.services.llm_service import llm_service
 from app.services.audit import AuditLog  # noqa: F401 — registers model for create_all
 from app.services.metrics import metrics
-from app.routers import chat, auth, voice
+from app.services.rate_governor import llm_governor
+from app.services.executors import blocking_executor, llm_executor
+from app.services.session_backend import session_backend, sweep_expired
+from app.routers import chat, auth, voice, admin
 
+metrics.set_gauge("app_import_ms", round((time.perf_counter() - _IMPORT_START) * 1000, 1))
+
+# Startup progress per component; the app is ready once all are True
+readiness = {"database": False, "rag": False, "llm": False, "warmup": False}
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Startup and shutdown events."""
-    # ── Startup ──
-    print("\n🏥 Starting City General Hospital Voice Assistant...\n")
 
-    # Initialize database
-    print("📦 Initializing database...")
+def _init_database():
     init_db()
     seed_database()
 
-    # Initialize RAG service
-    print("🔍 Initializing RAG knowledge base...")
-    rag_service.initialize()
 
-    # Initialize LLM service
-    print("🤖 Initializing LLM service...")
-    llm_service.initialize()
-
-    print("\n✅ All systems ready!")
+async def _start_component(name: str, fn) -> bool:
+    """Run a blocking startup step in the executor, timing it; failures are logged, not raised."""
+    start = time.perf_counter()
+    try:
+        await blocking_executor.run(fn)
+    except Exception as e:
+        print(f"❌ Startup step '{name}' failed: {e}")
+        return False
+    finally:
+        metrics.set_gauge(f"startup_{name}_ms", round((time.perf_counter() - start) * 1000, 1))
+    readiness[name] = True
+    return True
+
+
+async def _start_services(app: FastAPI, started: float) -> None:
+    """Initialise the database, RAG and LLM concurrently, then warm up the embedding model."""
+    print("📦 Initializing database, 🔍 RAG knowledge base and 🤖 LLM service...")
+    _, rag_ok, _ = await asyncio.gather(
+        _start_component("database", _init_database),
+        _start_component("rag", rag_service.initialize),
+        _start_component("llm", llm_service.initialize),
+    )
+    if rag_ok:
+        await _start_component("warmup", rag_service.warm_up)
+        if settings.FAQ_WATCH_INTERVAL_SECONDS > 0:
+            app.state.faq_watcher = asyncio.create_task(rag_service.watch(settings.FAQ_WATCH_INTERVAL_SECONDS))
+
+    startup_ms = round((time.perf_counter() - started) * 1000, 1)
+    metrics.set_gauge("startup_ms", startup_ms)
+    ready = all(readiness.values())
+    metrics.set_gauge("ready", int(ready))
+    if not ready:
+        failed = [name for name, done in readiness.items() if not done]
+        print(f"\n⚠️  Started in {startup_ms} ms but NOT ready: {', '.join(failed)} failed\n")
+        return
+
+    print(f"\n✅ All systems ready! ({startup_ms} ms)")
     print("🌐 Open http://localhost:8000 in your browser\n")
     print("=" * 50)
     print("  Test Patient Accounts:")
@@ -53,10 +88,33 @@ async def lifespan(app: FastAPI):
     else:
         print("📞 Twilio telephony NOT configured (set TWILIO_* in .env)\n")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown events."""
+    # ── Startup ──
+    print("\n🏥 Starting City General Hospital Voice Assistant...\n")
+
+    # Liveness is immediate; readiness (/health/ready) follows once startup completes
+    app.state.faq_watcher = None
+    startup = asyncio.create_task(_start_services(app, time.perf_counter()))
+    session_sweeper = None
+    if settings.SESSION_SWEEP_INTERVAL_SECONDS > 0:
+        session_sweeper = asyncio.create_task(sweep_expired(session_backend, settings.SESSION_SWEEP_INTERVAL_SECONDS))
+
     yield
 
     # ── Shutdown ──
     print("\n👋 Shutting down Hospital Assistant...")
+    startup.cancel()
+    if app.state.faq_watcher:
+        app.state.faq_watcher.cancel()
+    if session_sweeper:
+        session_sweeper.cancel()
+    # Without waiting: a running sync or ingest job would block the event loop
+    # until it finished. Its thread still completes before the process exits.
+    blocking_executor.shutdown(wait=False)
+    llm_executor.shutdown(wait=False)
 
 
 # ── Create FastAPI App ───────────────────────────────
@@ -81,6 +139,7 @@ app.add_middleware(
 app.include_router(chat.router)
 app.include_router(auth.router)
 app.include_router(voice.router)
+app.include_router(admin.router)
 
 # Mount static files (frontend)
 frontend_dir = Path(settings.FRONTEND_DIR)
@@ -99,16 +158,34 @@ async def serve_frontend():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness: the process is up and serving, even while still starting."""
     return {
         "status": "healthy",
         "service": "City General Hospital Assistant",
+        "ready": all(readiness.values()),
         "llm_ready": llm_service._initialized,
         "rag_ready": rag_service._initialized,
+        "session_backend": settings.SESSION_BACKEND,
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the database, RAG, LLM and warm-up are done, else 503."""
+    ready = all(readiness.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "components": readiness},
+    )
+
+
 @app.get("/metrics")
 async def get_metrics():
     """Expose application metrics for monitoring."""
-    return metrics.snapshot()
+    snapshot = metrics.snapshot()
+    snapshot["llm_governor"] = llm_governor.status()
+    snapshot["executors"] = {
+        "blocking": blocking_executor.status(),
+        "llm": llm_executor.status(),
+    }
+    return snapshot
@@ -0,0 +1,39 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.config import settings
+from app.services.executors import blocking_executor
+from app.services.rag_service import rag_service
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin_key(x_admin_key: str = Header("")):
+    """Admin endpoints are disabled unless ADMIN_API_KEY is set, and need it in X-Admin-Key."""
+    if not settings.ADMIN_API_KEY or not hmac.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+
+def require_rag_ready():
+    """Syncing needs the collections opened by RAGService.initialize (still starting, or failed)."""
+    if not rag_service._initialized:
+        raise HTTPException(status_code=503, detail="RAG service is not initialized yet")
+
+
+@router.post("/faqs/reload", dependencies=[Depends(require_admin_key), Depends(require_rag_ready)])
+async def reload_faqs():
+    """
+    Re-index FAQ files changed since the last sync, without a restart.
+    Only this worker reloads; the FAQ watcher covers every worker.
+    """
+    summary = await blocking_executor.run(rag_service.sync)
+    return {"success": True, **summary}
+
+
+@router.post("/faqs/reindex", dependencies=[Depends(require_admin_key), Depends(require_rag_ready)])
+async def reindex_faqs():
+    """
+    Re-chunk and re-embed the whole knowledge base (e.g. after changing the
+    embedding model). Queries are served from the old index until it is done.
+    """
+    summary = await blocking_executor.run(rag_service.sync, True)
+    return {"success": True, **summary}
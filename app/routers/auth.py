@@ -11,7 +11,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/login", response_model=LoginResponse)
 async def login(request: LoginRequest, db: Session = Depends(get_db)):
     """Send OTP to a registered phone number."""
-    session = session_store.get_or_create_session(request.session_id)
+    session = await session_store.get_or_create_session(request.session_id)
     session_id = session["session_id"]
 
     patient = auth_service.lookup_patient(db, request.phone)
@@ -22,8 +22,8 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             session_id=session_id,
         )
 
-    otp = auth_service.generate_otp(request.phone)
-    session_store.update_session(session_id, phone=request.phone)
+    otp = await auth_service.generate_otp(request.phone)
+    await session_store.update_session(session_id, phone=request.phone)
 
     return LoginResponse(
         success=True,
@@ -35,14 +35,14 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 @router.post("/verify-otp", response_model=OTPVerifyResponse)
 async def verify_otp(request: OTPVerifyRequest, db: Session = Depends(get_db)):
     """Verify OTP and upgrade session to registered."""
-    success, message = auth_service.verify_otp(request.phone, request.otp)
+    success, message = await auth_service.verify_otp(request.phone, request.otp)
 
     if not success:
         return OTPVerifyResponse(success=False, message=message)
 
     patient = auth_service.lookup_patient(db, request.phone)
     if patient:
-        session_store.upgrade_to_registered(
+        await session_store.upgrade_to_registered(
             request.session_id,
             patient_id=patient.id,
             patient_name=patient.name,
@@ -43,7 +43,7 @@ async def websocket_chat(websocket: WebSocket, db: Session = Depends(get_db)):
             if msg_type == "init":
                 # Client sends session_id if it has one
                 session_id = data.get("session_id")
-                session = session_store.get_or_create_session(session_id)
+                session = await session_store.get_or_create_session(session_id)
                 session_id = session["session_id"]
                 await websocket.send_json({
                     "type": "init",
@@ -59,10 +59,10 @@ async def websocket_chat(websocket: WebSocket, db: Session = Depends(get_db)):
                 # Look up patient
                 patient = auth_service.lookup_patient(db, phone)
                 if patient:
-                    otp = auth_service.generate_otp(phone)
-                    session = session_store.get_or_create_session(session_id)
+                    otp = await auth_service.generate_otp(phone)
+                    session = await session_store.get_or_create_session(session_id)
                     session_id = session["session_id"]
-                    session_store.update_session(session_id, phone=phone)
+                    await session_store.update_session(session_id, phone=phone)
                     await websocket.send_json({
                         "type": "login_response",
                         "success": True,
@@ -80,12 +80,12 @@ async def websocket_chat(websocket: WebSocket, db: Session = Depends(get_db)):
             if msg_type == "verify_otp":
                 phone = data.get("phone", "")
                 otp = data.get("otp", "")
-                success, message = auth_service.verify_otp(phone, otp)
+                success, message = await auth_service.verify_otp(phone, otp)
 
                 if success:
                     patient = auth_service.lookup_patient(db, phone)
                     if patient and session_id:
-                        session_store.upgrade_to_registered(
+                        await session_store.upgrade_to_registered(
                             session_id,
                             patient_id=patient.id,
                             patient_name=patient.name,
@@ -121,21 +121,29 @@ async def websocket_chat(websocket: WebSocket, db: Session = Depends(get_db)):
                 # Send typing indicator
                 await websocket.send_json({"type": "typing", "status": True})
 
+                # Stream reply text as chat_chunk frames if the client asked for it
+                stream = bool(data.get("stream", False))
+
+                async def send_chunk(text: str):
+                    await websocket.send_json({"type": "chat_chunk", "delta": text})
+
                 # Process through orchestrator
                 result = await orchestrator.process_message(
                     user_message=user_message,
                     session_id=session_id,
                     db=db,
+                    on_chunk=send_chunk if stream else None,
                 )
                 session_id = result["session_id"]
 
-                # Send response
+                # Send response (final frame — carries the full reply and session state)
                 await websocket.send_json({
                     "type": "chat_response",
                     "reply": result["reply"],
                     "session_id": result["session_id"],
                     "user_type": result["user_type"],
                     "verified": result["verified"],
+                    "streamed": stream,
                 })
                 continue
 
@@ -16,6 +16,7 @@ from app.services.voice_session import voice_session_store, CallState
 from app.services.session_store import session_store
 from app.services.orchestrator import orchestrator
 from app.services.auth_service import auth_service
+from app.services.deadline import Deadline
 from app.services.metrics import metrics
 from app.models import Appointment
 
@@ -97,13 +98,13 @@ async def voice_incoming(
     metrics.increment("voice_calls_total")
 
     # Create voice session
-    vs = voice_session_store.create_session(CallSid, From)
+    await voice_session_store.create_session(CallSid, From)
 
     # Also create an app session for the orchestrator
-    app_session = session_store.get_or_create_session(None)
-    vs["session_id"] = app_session["session_id"]
+    app_session = await session_store.get_or_create_session(None)
+    vs = await voice_session_store.update_session(CallSid, session_id=app_session["session_id"])
 
-    voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
+    await voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
 
     # Build greeting TwiML
     vr = VoiceResponse()
@@ -120,7 +121,7 @@ async def voice_incoming(
         print(f"  🔓 Auto-login successful for: {patient_name} ({caller_clean})")
 
         # Upgrade voice session
-        voice_session_store.update_session(
+        await voice_session_store.update_session(
             CallSid,
             user_type="registered",
             verified=True,
@@ -130,7 +131,7 @@ async def voice_incoming(
         )
 
         # Upgrade app session (for orchestrator tools)
-        session_store.upgrade_session(
+        await session_store.upgrade_session(
             vs["session_id"],
             patient_id=patient.id,
             patient_name=patient_name,
@@ -184,8 +185,11 @@ async def voice_respond(
     """
     Called after each speech input. Processes the transcript through
     the orchestrator and responds with TTS.
+    The turn runs under VOICE_TURN_BUDGET_SECONDS so Twilio always gets a
+    reply before it abandons the webhook.
     """
-    vs = voice_session_store.get_session(CallSid)
+    deadline = Deadline(settings.VOICE_TURN_BUDGET_SECONDS, name="voice")
+    vs = await voice_session_store.get_session(CallSid)
     if not vs:
         vr = VoiceResponse()
         say(vr, "Sorry, your session has expired. Please call again.")
@@ -194,7 +198,7 @@ async def voice_respond(
 
     transcript = SpeechResult.strip()
     confidence = float(Confidence) if Confidence else 0
-    turn = voice_session_store.increment_turn(CallSid)
+    turn = await voice_session_store.increment_turn(CallSid)
 
     print(f"  🎤 Turn {turn} | Transcript: \"{transcript}\" (confidence: {confidence:.2f})")
 
@@ -203,7 +207,7 @@ async def voice_respond(
 
     # ── Login request ──
     if Digits == "1" or any(word in lower_text for word in ["login", "log in", "sign in", "registered", "my account"]):
-        return _start_login_flow(CallSid, vs)
+        return await _start_login_flow(CallSid, vs)
 
     # ── Escalation / transfer request ──
     if any(phrase in lower_text for phrase in [
@@ -211,11 +215,11 @@ async def voice_respond(
         "human", "agent", "operator", "receptionist",
         "transfer", "connect me", "real person", "staff",
     ]):
-        return _transfer_to_staff(CallSid)
+        return await _transfer_to_staff(CallSid)
 
     # ── Hang up request ──
     if any(word in lower_text for word in ["goodbye", "bye", "hang up", "end call", "that's all", "thank you bye"]):
-        return _end_call(CallSid)
+        return await _end_call(CallSid)
 
     # ── Low confidence — ask to repeat ──
     if confidence > 0 and confidence < 0.4 and transcript:
@@ -234,12 +238,16 @@ async def voice_respond(
             user_message=transcript,
             session_id=vs["session_id"],
             db=db,
+            deadline=deadline,
         )
 
         # Update voice session with any auth changes
-        vs["session_id"] = result.get("session_id", vs["session_id"])
-        vs["user_type"] = result.get("user_type", vs["user_type"])
-        vs["verified"] = result.get("verified", vs["verified"])
+        await voice_session_store.update_session(
+            CallSid,
+            session_id=result.get("session_id", vs["session_id"]),
+            user_type=result.get("user_type", vs["user_type"]),
+            verified=result.get("verified", vs["verified"]),
+        )
 
         reply = result["reply"]
 
@@ -251,6 +259,7 @@ async def voice_respond(
     except Exception as e:
         print(f"  ❌ Orchestrator error: {e}")
         voice_reply = "I'm having trouble processing your request. Please try again."
+    deadline.finish()
 
     # Respond and gather next input
     vr = VoiceResponse()
@@ -266,9 +275,9 @@ async def voice_respond(
 
 # ── Login Flow Endpoints ────────────────────────────────
 
-def _start_login_flow(call_sid: str, vs: dict) -> Response:
+async def _start_login_flow(call_sid: str, vs: dict) -> Response:
     """Initiate the login flow — ask for phone number."""
-    voice_session_store.set_state(call_sid, CallState.AWAITING_LOGIN_PHONE)
+    await voice_session_store.set_state(call_sid, CallState.AWAITING_LOGIN_PHONE)
 
     vr = VoiceResponse()
     gather_speech(
@@ -285,7 +294,7 @@ async def voice_login_input(
     db: Session = Depends(get_db),
 ):
     """Captures the phone number spoken by the caller."""
-    vs = voice_session_store.get_session(CallSid)
+    vs = await voice_session_store.get_session(CallSid)
     if not vs:
         vr = VoiceResponse()
         say(vr, "Session expired. Please call again.")
@@ -313,13 +322,13 @@ async def voice_login_input(
     if not result["success"]:
         vr = VoiceResponse()
         say(vr, f"{result['message']}. Let me help you with general information instead.")
-        voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
+        await voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
         gather_speech(vr, "/voice/respond", prompt="What would you like to know?")
         return twiml_response(vr)
 
     # Store login state
-    voice_session_store.update_session(CallSid, login_phone=phone)
-    voice_session_store.set_state(CallSid, CallState.AWAITING_OTP)
+    await voice_session_store.update_session(CallSid, login_phone=phone)
+    await voice_session_store.set_state(CallSid, CallState.AWAITING_OTP)
 
     # Ask for OTP via DTMF (keypad)
     vr = VoiceResponse()
@@ -341,7 +350,7 @@ async def voice_verify_otp(
     db: Session = Depends(get_db),
 ):
     """Verifies the OTP entered via DTMF."""
-    vs = voice_session_store.get_session(CallSid)
+    vs = await voice_session_store.get_session(CallSid)
     if not vs:
         vr = VoiceResponse()
         say(vr, "Session expired. Please call again.")
@@ -363,7 +372,7 @@ async def voice_verify_otp(
         return twiml_response(vr)
 
     # Verify OTP
-    result = auth_service.verify_otp(phone, otp, db)
+    result = await auth_service.verify_otp(phone, otp, db)
 
     if not result["success"]:
         vr = VoiceResponse()
@@ -379,21 +388,21 @@ async def voice_verify_otp(
 
     # Upgrade the app session
     if vs.get("session_id"):
-        session_store.upgrade_session(
+        await session_store.upgrade_session(
             vs["session_id"],
             patient_id=result.get("patient_id"),
             patient_name=patient_name,
             patient_code=result.get("patient_code", ""),
         )
 
-    voice_session_store.update_session(
+    await voice_session_store.update_session(
         CallSid,
         user_type="registered",
         verified=True,
         patient_id=result.get("patient_id"),
         patient_name=patient_name,
     )
-    voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
+    await voice_session_store.set_state(CallSid, CallState.MAIN_LOOP)
 
     print(f"  ✅ Patient verified: {patient_name}")
 
@@ -421,7 +430,7 @@ async def voice_status(
     print(f"  📊 Call status: {CallStatus} (duration: {CallDuration}s, sid: {CallSid[:8]}...)")
 
     if CallStatus in ("completed", "failed", "busy", "no-answer", "canceled"):
-        voice_session_store.end_session(CallSid)
+        await voice_session_store.end_session(CallSid)
         if CallStatus == "completed":
             metrics.observe("voice_call_duration_s", float(CallDuration))
         elif CallStatus == "failed":
@@ -432,9 +441,9 @@ async def voice_status(
 
 # ── Helpers ─────────────────────────────────────────────
 
-def _end_call(call_sid: str) -> Response:
+async def _end_call(call_sid: str) -> Response:
     """End the call gracefully."""
-    voice_session_store.set_state(call_sid, CallState.GOODBYE)
+    await voice_session_store.set_state(call_sid, CallState.GOODBYE)
 
     vr = VoiceResponse()
     say(vr, (
@@ -443,13 +452,13 @@ def _end_call(call_sid: str) -> Response:
     ))
     vr.hangup()
 
-    voice_session_store.end_session(call_sid)
+    await voice_session_store.end_session(call_sid)
     return twiml_response(vr)
 
 
-def _transfer_to_staff(call_sid: str) -> Response:
+async def _transfer_to_staff(call_sid: str) -> Response:
     """Transfer the caller to hospital reception / human agent."""
-    voice_session_store.set_state(call_sid, CallState.GOODBYE)
+    await voice_session_store.set_state(call_sid, CallState.GOODBYE)
 
     vr = VoiceResponse()
     reception = settings.HOSPITAL_RECEPTION_NUMBER
@@ -473,7 +482,7 @@ def _transfer_to_staff(call_sid: str) -> Response:
         # Don't hang up — go back to conversation
         gather_speech(vr, "/voice/respond")
 
-    voice_session_store.end_session(call_sid)
+    await voice_session_store.end_session(call_sid)
     return twiml_response(vr)
 
 
@@ -0,0 +1,132 @@
+"""
+Answer Cache — serves repeated guest FAQ questions without an LLM call.
+
+Entries are keyed by the set of FAQ chunk IDs retrieved for the question and
+matched on cosine similarity of the (normalised) query embedding, so
+"OPD timings?" and "what are your OPD timings" share one answer as long as
+they pull the same knowledge base context. The whole cache is dropped when
+the RAG index version changes.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from app.config import settings
+from app.services.metrics import metrics
+
+
+class _CachedAnswer:
+    """A cached reply plus the normalised embedding of the question it answered."""
+
+    __slots__ = ("embedding", "answer", "created_at")
+
+    def __init__(self, embedding: List[float], answer: str):
+        self.embedding = embedding
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of guest answers.
+
+    Args:
+        max_entries: Maximum number of cached answers across all chunk sets
+        ttl_seconds: How long an answer stays valid
+        similarity_threshold: Minimum cosine similarity for a hit
+    """
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: int = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # chunk-id key → answers for that context, least recently used first
+        self._buckets: OrderedDict[tuple, list[_CachedAnswer]] = OrderedDict()
+        self._size = 0
+        self._index_version = None
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(rag_context: List[dict]) -> tuple:
+        return tuple(sorted(ctx["id"] for ctx in rag_context))
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        return [x / norm for x in embedding]
+
+    def _sync_index_version(self, index_version: int) -> None:
+        """Drop everything if the FAQ index has been rebuilt since the last call."""
+        if index_version != self._index_version:
+            if self._size:
+                metrics.increment("answer_cache_invalidations")
+            self.clear()
+            self._index_version = index_version
+
+    def get(self, embedding: List[float], rag_context: List[dict], index_version: int) -> Optional[str]:
+        """Return a cached answer for a similar question with the same context, if any."""
+        self._sync_index_version(index_version)
+        key = self._key(rag_context)
+        answer = None
+
+        bucket = self._buckets.get(key)
+        if bucket:
+            now = time.time()
+            live = [e for e in bucket if now - e.created_at <= self.ttl_seconds]
+            self._size -= len(bucket) - len(live)
+            query = self._normalize(embedding)
+            best = 0.0
+            for entry in live:
+                similarity = sum(a * b for a, b in zip(query, entry.embedding))
+                if similarity >= self.similarity_threshold and similarity > best:
+                    best, answer = similarity, entry.answer
+            if live:
+                self._buckets[key] = live
+                self._buckets.move_to_end(key)
+            else:
+                del self._buckets[key]
+
+        self._record(answer is not None)
+        return answer
+
+    def put(self, embedding: List[float], rag_context: List[dict], answer: str, index_version: int) -> None:
+        """Cache an answer for the given question embedding and retrieved context."""
+        self._sync_index_version(index_version)
+        key = self._key(rag_context)
+        self._buckets.setdefault(key, []).append(_CachedAnswer(self._normalize(embedding), answer))
+        self._buckets.move_to_end(key)
+        self._size += 1
+
+        # Evict from the least recently used context first
+        while self._size > self.max_entries:
+            oldest_key, oldest = next(iter(self._buckets.items()))
+            oldest.pop(0)
+            self._size -= 1
+            if not oldest:
+                del self._buckets[oldest_key]
+
+        metrics.set_gauge("answer_cache_entries", self._size)
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        self._buckets.clear()
+        self._size = 0
+        metrics.set_gauge("answer_cache_entries", 0)
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+            metrics.increment("answer_cache_hits")
+        else:
+            self._misses += 1
+            metrics.increment("answer_cache_misses")
+        metrics.set_gauge("answer_cache_hit_rate", round(self._hits / (self._hits + self._misses), 3))
+
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_SIZE,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+)
@@ -2,66 +2,68 @@ import random
 import time
 from typing import Optional, Tuple
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models import Patient
+from app.services.session_backend import MemorySessionBackend, call_backend, session_backend
 
 
 class AuthService:
     """Handles patient identity lookup and OTP verification."""
 
-    def __init__(self):
-        # Store pending OTPs: {phone: {"otp": "123456", "expires": timestamp}}
-        self._pending_otps: dict = {}
-        self._otp_ttl = 300  # 5 minutes
+    OTP_NAMESPACE = "otp"
+
+    def __init__(self, backend=None, otp_ttl_seconds: int = 300):
+        # Pending OTPs by phone: {"otp": "123456", "expires_at": ...}, kept in the
+        # shared session backend so any worker can verify them. The record
+        # outlives the OTP by another TTL, so an expired code is reported as
+        # expired rather than as never requested.
+        self._otps = backend or MemorySessionBackend()
+        self._otp_ttl = otp_ttl_seconds
 
     def lookup_patient(self, db: Session, phone: str) -> Optional[Patient]:
         """Look up a patient by phone number."""
         return db.query(Patient).filter(Patient.phone == phone).first()
 
-    def generate_otp(self, phone: str) -> str:
+    async def generate_otp(self, phone: str) -> str:
         """Generate a 6-digit OTP for the given phone number."""
         otp = str(random.randint(100000, 999999))
-        self._pending_otps[phone] = {
-            "otp": otp,
-            "expires": time.time() + self._otp_ttl,
-        }
+        record = {"otp": otp, "expires_at": time.time() + self._otp_ttl}
+        await call_backend(self._otps, "set", self.OTP_NAMESPACE, phone, record, 2 * self._otp_ttl)
         # In production, this would send via SMS
         print(f"\n{'='*50}")
         print(f"  OTP for {phone}: {otp}")
-        print(f"  (Valid for 5 minutes)")
+        print(f"  (Valid for {self._otp_ttl} seconds)")
         print(f"{'='*50}\n")
         return otp
 
-    def verify_otp(self, phone: str, otp: str) -> Tuple[bool, str]:
+    async def verify_otp(self, phone: str, otp: str) -> Tuple[bool, str]:
         """
         Verify the OTP for a phone number.
         Returns (success, message).
         """
-        pending = self._pending_otps.get(phone)
+        pending = await call_backend(self._otps, "get", self.OTP_NAMESPACE, phone)
 
         if not pending:
             return False, "No OTP was requested for this number. Please request a new OTP."
 
-        if time.time() > pending["expires"]:
-            del self._pending_otps[phone]
+        if pending["expires_at"] <= time.time():
+            await call_backend(self._otps, "pop", self.OTP_NAMESPACE, phone)
             return False, "OTP has expired. Please request a new one."
 
         if pending["otp"] != otp:
             return False, "Invalid OTP. Please check and try again."
 
-        # OTP verified — clean up
-        del self._pending_otps[phone]
+        # OTP verified — consume it atomically, so a concurrent request with
+        # the same code (e.g. on another worker) cannot verify twice
+        consumed = await call_backend(self._otps, "pop", self.OTP_NAMESPACE, phone)
+        if not consumed or consumed["otp"] != otp or consumed["expires_at"] <= time.time():
+            return False, "This OTP is no longer valid. Please request a new one."
         return True, "OTP verified successfully!"
 
-    def cleanup_expired(self):
-        """Remove expired OTPs."""
-        now = time.time()
-        expired = [
-            phone for phone, data in self._pending_otps.items()
-            if now > data["expires"]
-        ]
-        for phone in expired:
-            del self._pending_otps[phone]
+    async def cleanup_expired(self) -> int:
+        """Remove expired OTPs; returns how many."""
+        return await call_backend(self._otps, "purge_expired", self.OTP_NAMESPACE)
 
 
 # Global auth service instance
-auth_service = AuthService()
+auth_service = AuthService(session_backend, settings.OTP_TTL_SECONDS)
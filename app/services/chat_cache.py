@@ -0,0 +1,74 @@
+"""
+Chat Cache — keeps live LLM chat objects per session so each turn only
+appends the new messages instead of rebuilding the whole history.
+
+A cached chat is checked out for the duration of a turn and checked back in
+once the reply has been stored, so two concurrent turns on the same session
+never share one chat object.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.services.session_store import SessionRecord
+
+
+class CachedChat:
+    """A live chat object plus the session bookkeeping needed to validate it."""
+
+    def __init__(self, session_id: str, chat: Any, epoch: int, message_count: int, window_len: int):
+        self.session_id = session_id
+        self.chat = chat
+        self.epoch = epoch                  # session history_epoch when the chat was built
+        self.message_count = message_count  # session messages reflected in the chat
+        self.window_len = window_len        # messages currently held in chat history
+        self.turn_start = window_len        # chat history index where the current turn begins
+        self.last_used = time.time()
+
+    def is_valid_for(self, session: SessionRecord) -> bool:
+        """
+        Check the chat still mirrors the session's history.
+        The current user message has already been added to the session,
+        so a valid chat reflects every message except that one, and none of the
+        messages it holds may have been trimmed out of the session store.
+        """
+        if self.epoch != session.history_epoch:
+            return False
+        total = session.message_count
+        if self.message_count != total - 1:
+            return False
+        oldest_held = self.message_count - self.window_len
+        oldest_stored = total - session.history_len
+        return oldest_held >= oldest_stored
+
+
+class ChatCache:
+    """Bounded LRU of CachedChat entries keyed by session ID."""
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: int = 1800):
+        self._entries: OrderedDict[str, CachedChat] = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+
+    def checkout(self, session: SessionRecord) -> Optional[CachedChat]:
+        """Remove and return the session's chat if it is still valid."""
+        entry = self._entries.pop(session.session_id, None)
+        if entry is None:
+            return None
+        if time.time() - entry.last_used > self._ttl or not entry.is_valid_for(session):
+            return None
+        return entry
+
+    def checkin(self, entry: CachedChat) -> None:
+        """Return a chat to the cache, evicting the least recently used if full."""
+        entry.last_used = time.time()
+        self._entries[entry.session_id] = entry
+        self._entries.move_to_end(entry.session_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop the cached chat for a session."""
+        self._entries.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,176 @@
+"""
+Chunker — splits markdown knowledge base files into token-bounded chunks.
+
+Each chunk stays within a token budget. Sections are split on headings,
+long sections on paragraphs, lines, sentences and finally words. Consecutive
+chunks of a section share a configurable overlap. Every chunk starts with
+its heading path ("Departments > Cardiology") so even a short section keeps
+its context. Chunks record where their body came from in the source file
+(character offsets).
+
+A leading "---" frontmatter block (e.g. "access_level: registered") is read
+by split_frontmatter and is not part of any chunk.
+
+Token counts are estimates (words and punctuation marks), close enough to
+the embedding model's word-piece count to keep chunks inside its window.
+"""
+import re
+from typing import List, Tuple
+
+_FRONTMATTER = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# (start offset, end offset) of a piece of a section body in the source text
+Span = Tuple[int, int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count: words and punctuation marks."""
+    return len(_TOKEN.findall(text))
+
+
+def split_frontmatter(content: str) -> Tuple[dict, int]:
+    """
+    Read a leading "---" frontmatter block of simple "key: value" lines.
+
+    Returns (fields with lowercased keys, offset where the body starts);
+    ({}, 0) when there is no frontmatter.
+    """
+    match = _FRONTMATTER.match(content)
+    if not match:
+        return {}, 0
+    fields = {}
+    for line in match.group(1).splitlines():
+        key, separator, value = line.partition(":")
+        if separator and key.strip():
+            fields[key.strip().lower()] = value.strip().strip("\"'")
+    return fields, match.end()
+
+
+def chunk_markdown(content: str, max_tokens: int = 200, overlap_tokens: int = 30) -> List[dict]:
+    """
+    Split markdown into chunks of at most ~max_tokens each.
+
+    Returns a list of:
+        {
+            "text": str,          # heading path line + chunk body
+            "heading_path": str,  # e.g. "Departments > Cardiology"
+            "start": int,         # character offset of the body in content
+            "end": int,
+            "tokens": int,        # estimated tokens of text
+        }
+    """
+    chunks = []
+    for heading_path, body_start, body_end in _sections(content):
+        spans = _split_span(content, body_start, body_end, max_tokens)
+        if not spans:
+            continue
+        prefix = f"{heading_path}\n" if heading_path else ""
+        budget = max(1, max_tokens - estimate_tokens(prefix))
+        for start, end in _pack(content, spans, budget, overlap_tokens):
+            text = prefix + content[start:end].strip()
+            chunks.append({
+                "text": text,
+                "heading_path": heading_path,
+                "start": start,
+                "end": end,
+                "tokens": estimate_tokens(text),
+            })
+    return chunks
+
+
+def _sections(content: str) -> List[Tuple[str, int, int]]:
+    """Split on headings; returns (heading path, body start, body end) per section."""
+    sections = []
+    stack: List[Tuple[int, str]] = []   # (level, title) of the enclosing headings
+    body_start = 0
+    offset = 0
+
+    def close(end: int) -> None:
+        if content[body_start:end].strip():
+            sections.append((" > ".join(title for _, title in stack), body_start, end))
+
+    for line in content.splitlines(keepends=True):
+        match = _HEADING.match(line.rstrip("\n"))
+        if match:
+            close(offset)
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2).strip()))
+            body_start = offset + len(line)
+        offset += len(line)
+    close(len(content))
+    return sections
+
+
+def _split_span(content: str, start: int, end: int, max_tokens: int) -> List[Span]:
+    """Break a body into pieces no larger than max_tokens, at the coarsest boundary that works."""
+    text = content[start:end]
+    if not text.strip():
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [_trim(content, start, end)]
+
+    for pattern in (r"\n\s*\n", r"\n", _SENTENCE_END.pattern, r"\s+"):
+        pieces = _split_on(content, start, end, pattern)
+        if len(pieces) > 1:
+            spans = []
+            for piece_start, piece_end in pieces:
+                spans.extend(_split_span(content, piece_start, piece_end, max_tokens))
+            return spans
+
+    # A single unbreakable run of text
+    return [_trim(content, start, end)]
+
+
+def _split_on(content: str, start: int, end: int, pattern: str) -> List[Span]:
+    """Split content[start:end] on a separator regex, dropping empty pieces."""
+    pieces = []
+    cursor = start
+    for match in re.finditer(pattern, content[start:end]):
+        if content[cursor:start + match.start()].strip():
+            pieces.append((cursor, start + match.start()))
+        cursor = start + match.end()
+    if content[cursor:end].strip():
+        pieces.append((cursor, end))
+    return pieces
+
+
+def _trim(content: str, start: int, end: int) -> Span:
+    """Shrink a span to exclude surrounding whitespace."""
+    while start < end and content[start].isspace():
+        start += 1
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _pack(content: str, spans: List[Span], max_tokens: int, overlap_tokens: int) -> List[Span]:
+    """Greedily merge consecutive pieces into chunks; each new chunk repeats ~overlap_tokens of the last."""
+    chunks = []
+    current: List[Span] = []
+    current_tokens = 0
+
+    for span in spans:
+        tokens = estimate_tokens(content[span[0]:span[1]])
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append((current[0][0], current[-1][1]))
+            # Carry trailing pieces into the next chunk as overlap
+            carried: List[Span] = []
+            carried_tokens = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(content[previous[0]:previous[1]])
+                if carried_tokens + previous_tokens > overlap_tokens or carried_tokens + previous_tokens + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append(span)
+        current_tokens += tokens
+
+    if current:
+        chunks.append((current[0][0], current[-1][1]))
+    return chunks
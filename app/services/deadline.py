@@ -0,0 +1,79 @@
+"""
+Request deadlines — an end-to-end latency budget carried through one request.
+
+Voice turns must answer before Twilio gives up on the webhook, so the
+orchestrator checks the remaining budget before each stage and degrades
+instead of running over: skip RAG, send less history, stop the tool loop,
+or fall back to a holding answer. Once a write tool has started the request
+is committed: it runs to completion, even late, so the user learns whether
+the booking or cancellation happened.
+
+Metrics (prefix = deadline name, e.g. "voice"):
+    {name}_budget_{stage}_pct   — share of the budget each stage consumed
+    {name}_budget_used_pct      — share of the budget the whole request used
+    {name}_budget_{action}      — counters for each degradation taken
+    {name}_budget_exceeded      — requests that ran past their deadline
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from app.services.metrics import metrics
+from app.logger import logger
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage cannot start or finish within the remaining budget."""
+
+
+class Deadline:
+    """
+    Wall-clock budget for one request.
+
+    Args:
+        budget_seconds: Total time the request may take
+        name: Metric prefix for stage and degradation metrics
+    """
+
+    def __init__(self, budget_seconds: float, name: str = "request"):
+        self.name = name
+        self.budget_seconds = budget_seconds
+        self._start = time.monotonic()
+        self._expires_at = self._start + budget_seconds
+        self.committed = False   # set by commit(); a committed request is never abandoned
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.monotonic() - self._start
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator["Deadline"]:
+        """Record how much of the budget the enclosed stage consumed."""
+        start = time.monotonic()
+        try:
+            yield self
+        finally:
+            spent = time.monotonic() - start
+            metrics.observe(f"{self.name}_budget_{stage}_pct", round(100 * spent / self.budget_seconds, 1))
+
+    def commit(self) -> None:
+        """Mark the request as having side effects (a write tool started)."""
+        self.committed = True
+
+    def degrade(self, action: str) -> None:
+        """Count a degradation taken to stay within the budget."""
+        metrics.increment(f"{self.name}_budget_{action}")
+        logger.info(f"Deadline '{self.name}': {action} ({self.remaining():.2f}s left)")
+
+    def finish(self) -> None:
+        """Record total budget use once the request is complete."""
+        metrics.observe(f"{self.name}_budget_used_pct", round(100 * self.elapsed() / self.budget_seconds, 1))
+        if self.expired:
+            metrics.increment(f"{self.name}_budget_exceeded")
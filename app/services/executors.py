@@ -0,0 +1,87 @@
+"""
+Executors — sized thread pools for blocking work, kept off the event loop.
+
+Two pools so one kind of work cannot starve the other:
+- blocking_executor: RAG queries (Chroma + ONNX embedding), SQLAlchemy tool
+  calls and their audit commits.
+- llm_executor: LLM backend calls, which mostly sit waiting on the network.
+
+Each pool publishes how busy it is:
+    {name}_executor_active       gauge   — tasks currently running
+    {name}_executor_queued       gauge   — tasks waiting for a free thread
+    {name}_executor_saturation   gauge   — active / max_workers
+    {name}_executor_queue_wait_ms        — histogram of time spent waiting
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from app.config import settings
+from app.services.metrics import metrics
+
+T = TypeVar("T")
+
+
+class MeteredExecutor:
+    """
+    ThreadPoolExecutor wrapper that awaits blocking calls and reports saturation.
+
+    Args:
+        name: Metric prefix and thread name prefix
+        max_workers: Number of threads in the pool
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) in the pool and await its result."""
+        submitted = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            self._publish()
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._publish()
+            metrics.observe(f"{self.name}_executor_queue_wait_ms", (time.monotonic() - submitted) * 1000)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._publish()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, call)
+
+    def _publish(self) -> None:
+        """Update gauges; caller holds the lock."""
+        metrics.set_gauge(f"{self.name}_executor_active", self._active)
+        metrics.set_gauge(f"{self.name}_executor_queued", self._queued)
+        metrics.set_gauge(f"{self.name}_executor_saturation", round(self._active / self.max_workers, 3))
+
+    def status(self) -> dict:
+        """Current pool state for the /metrics endpoint."""
+        return {
+            "max_workers": self.max_workers,
+            "active": self._active,
+            "queued": self._queued,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and drop queued tasks; running tasks finish (waited for if wait)."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global executor instances
+blocking_executor = MeteredExecutor("blocking", settings.BLOCKING_EXECUTOR_WORKERS)
+llm_executor = MeteredExecutor("llm", settings.LLM_EXECUTOR_WORKERS)
@@ -0,0 +1,168 @@
+"""
+Document ingestion — turns one source file into index-ready chunks.
+
+Markdown, HTML and plain-text exports are supported. HTML is reduced to
+markdown (headings, paragraphs, list items) so every format goes through
+the same chunker. Access level and title come from Markdown frontmatter or
+from <meta name="access_level"> / <title> in HTML.
+
+chunk_document is a plain module-level function of picklable arguments so
+RAGService can run it in a process pool; this module must stay light to
+import (no chromadb, no app services).
+"""
+import hashlib
+import json
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Tuple
+
+from app.services.chunker import chunk_markdown, split_frontmatter
+
+# Part of every chunk ID — bump when chunking or the embedding model changes
+# so the persisted index is rebuilt instead of mixing old and new vectors.
+INDEX_FORMAT = "faq-v2"
+
+# Metadata fields that describe where a chunk sits in its file, not what it says
+POSITION_FIELDS = ("start_char", "end_char", "tokens")
+
+# Each access level is indexed in its own Chroma collection, so guest queries
+# never filter. Documents declare theirs in frontmatter ("access_level: registered").
+ACCESS_LEVELS = ("public", "registered")
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+HTML_EXTENSIONS = (".html", ".htm")
+TEXT_EXTENSIONS = (".txt",)
+SUPPORTED_EXTENSIONS = MARKDOWN_EXTENSIONS + HTML_EXTENSIONS + TEXT_EXTENSIONS
+
+
+class _HTMLToMarkdown(HTMLParser):
+    """Keeps the text of an HTML page with its heading structure; drops scripts, styles and navigation."""
+
+    _SKIP = {"script", "style", "noscript", "template", "nav", "svg"}
+    _BLOCK = {"p", "div", "section", "article", "main", "table", "tr", "ul", "ol", "blockquote", "pre", "br", "hr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.fields: dict = {}
+        self._skipping = 0
+        self._in_title = False
+        self._title = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("name") or "").lower()
+            if name in ("access_level", "title") and attrs.get("content"):
+                self.fields[name] = attrs["content"].strip()
+        elif re.fullmatch(r"h[1-6]", tag):
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" ")
+        elif tag in self._BLOCK:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif re.fullmatch(r"h[1-6]", tag) or tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title += data
+        elif not self._skipping:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    def result(self) -> Tuple[dict, str]:
+        fields = dict(self.fields)
+        if self._title.strip() and "title" not in fields:
+            fields["title"] = self._title.strip()
+        lines = [line.strip() for line in "".join(self.parts).splitlines()]
+        text = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+        return fields, text + "\n"
+
+
+def html_to_markdown(html: str) -> Tuple[dict, str]:
+    """Convert an HTML page to markdown text; returns (meta fields, markdown)."""
+    parser = _HTMLToMarkdown()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
+
+
+def parse_document(path: Path, content: str) -> Tuple[dict, str, int]:
+    """
+    Read a document's fields and body by format.
+
+    Returns (fields, text to chunk, offset of the body in text). Chunk
+    offsets point into the file for Markdown and plain text, and into the
+    converted text for HTML.
+    """
+    suffix = path.suffix.lower()
+    if suffix in HTML_EXTENSIONS:
+        fields, text = html_to_markdown(content)
+        return fields, text, 0
+    if suffix in TEXT_EXTENSIONS:
+        return {}, content, 0
+    fields, body_start = split_frontmatter(content)
+    return fields, content, body_start
+
+
+def chunk_id(document: str, metadata: dict) -> str:
+    """Stable ID from the chunk text, its metadata and the index format version."""
+    identity = {key: value for key, value in metadata.items() if key not in POSITION_FIELDS}
+    payload = json.dumps([INDEX_FORMAT, document, identity], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_document(
+    path: str, raw: bytes, default_level: str, max_tokens: int, overlap_tokens: int
+) -> Tuple[List[str], List[dict], List[str]]:
+    """
+    Split one document into token-bounded chunks; returns (documents, metadatas, content-hash ids).
+
+    Frontmatter (or HTML meta) may set the document's access_level and title (its "source").
+    """
+    doc_file = Path(path)
+    fields, text, body_start = parse_document(doc_file, raw.decode("utf-8", errors="replace"))
+    source = fields.get("title") or doc_file.stem.replace("_", " ").title()
+    access_level = fields.get("access_level", default_level)
+    if access_level not in ACCESS_LEVELS:
+        # Fail closed: an unknown level is never shown to guests
+        print(f"Warning: unknown access_level {access_level!r} in {doc_file.name}; indexing it as registered")
+        access_level = "registered"
+
+    documents = []
+    metadatas = []
+    ids = []
+    for chunk in chunk_markdown(text[body_start:], max_tokens=max_tokens, overlap_tokens=overlap_tokens):
+        metadata = {
+            "source": source,
+            "file": doc_file.name,
+            "access_level": access_level,
+            "heading_path": chunk["heading_path"],
+        }
+        new_id = chunk_id(chunk["text"], metadata)
+        if new_id in ids:  # identical section repeated in one file
+            continue
+        # Positional fields stay out of the ID, so edits elsewhere in the file don't force re-embedding
+        metadata.update(
+            start_char=body_start + chunk["start"],
+            end_char=body_start + chunk["end"],
+            tokens=chunk["tokens"],
+        )
+        documents.append(chunk["text"])
+        metadatas.append(metadata)
+        ids.append(new_id)
+
+    return documents, metadatas, ids
@@ -0,0 +1,70 @@
+"""
+Intent pre-classifier — decides whether a message needs FAQ retrieval.
+
+Runs locally on regexes before any embedding is computed. Acknowledgements,
+greetings, login/OTP chatter and (for verified users) requests that a tool
+answers from the patient's own records get no FAQ context, so they skip the
+embedding and vector query. Anything uncertain is classified "faq": a
+needless retrieval only costs latency, a missed one costs answer quality.
+"""
+import re
+
+# Words a purely conversational turn is made of ("ok thanks", "yes please")
+CONVERSATIONAL_WORDS = frozenset("""
+yes yeah yep yup sure ok okay alright fine great cool nice perfect good done
+no nope nah not now later
+thanks thank you thx so much very much lot
+hi hello hey morning afternoon evening bye goodbye see ya
+please confirm confirmed go ahead correct right that's it
+""".split())
+
+# Login chatter: OTP codes and phone numbers
+AUTH_PATTERNS = [
+    re.compile(r"\b(?:otp|one[- ]time password|verification code)\b", re.IGNORECASE),
+    re.compile(r"^\D{0,30}\b\d{6}\b\D{0,10}$"),                       # "123456", "code is 482193"
+    re.compile(r"^\D{0,30}(?:\+91[\s-]?)?\b\d{10}\b\D{0,10}$"),       # "my number is 9876543210"
+]
+
+# Requests served by tools from the patient's own records
+TOOL_PATTERNS = [
+    re.compile(r"\bmy (?:upcoming |next |last |latest )?(?:appointments?|bookings?|bills?|billing|invoices?|dues|payments?|balance|reports?|(?:lab |test )?results?)\b", re.IGNORECASE),
+    re.compile(r"\b(?:cancel|reschedule)\b.*\b(?:appointment|booking)\b", re.IGNORECASE),
+    re.compile(r"\b(?:appointment|booking)\s*(?:#|no\.?|number|id)?\s*\d+\b", re.IGNORECASE),
+    re.compile(r"^(?:please\s+)?book\b.*\b(?:with|for)\b.*\b(?:dr\.?|doctor)\b", re.IGNORECASE),
+]
+
+# Cues that the user wants hospital information, even alongside tool words
+FAQ_CUES = re.compile(
+    r"\b(?:how|why|policy|policies|rules?|refunds?|fees?|charges?|costs?|price|timings?|hours|"
+    r"where|allowed|insurance|procedure|process|documents?|visiting)\b",
+    re.IGNORECASE,
+)
+
+
+def classify(message: str, verified: bool = False) -> str:
+    """
+    Classify a message for retrieval gating.
+
+    Returns one of:
+        "conversational"  # acknowledgement, greeting, yes/no
+        "auth"            # OTP or phone number during login
+        "tool"            # verified user's request about their own records
+        "faq"             # anything else — retrieve
+    """
+    text = message.strip()
+    words = re.findall(r"[a-z']+", text.lower())
+    if not re.search(r"\d", text) and len(words) <= 6 and all(word in CONVERSATIONAL_WORDS for word in words):
+        return "conversational"
+
+    if any(pattern.search(text) for pattern in AUTH_PATTERNS):
+        return "auth"
+
+    if verified and not FAQ_CUES.search(text) and any(pattern.search(text) for pattern in TOOL_PATTERNS):
+        return "tool"
+
+    return "faq"
+
+
+def needs_retrieval(intent: str) -> bool:
+    """Only FAQ-style messages benefit from knowledge base context."""
+    return intent == "faq"
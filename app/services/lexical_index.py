@@ -0,0 +1,98 @@
+"""
+Lexical Index — in-process BM25 over the FAQ chunks.
+
+Dense retrieval is weak on exact terms (department names, "ENT", insurer
+names, floor numbers); BM25 is strong on exactly those. RAGService fuses
+both rankings and can answer keyword queries from this index alone.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+
+# Words that carry no retrieval signal in hospital FAQ questions
+STOPWORDS = frozenset("""
+a an and any are as at be can could do does for from get have how i if in is it
+me my of on or please show should tell that the there this to us want was we
+what when where which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed ("ENT", "2nd", "3" are kept)."""
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index.
+
+    Args:
+        k1: Term frequency saturation
+        b: Document length normalisation
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._lengths: List[int] = []
+        self._avg_length = 0.0
+        self._postings: dict[str, List[Tuple[int, int]]] = {}   # term → [(doc index, term frequency)]
+        self._idf: dict[str, float] = {}
+        self._positions: dict[str, int] = {}
+
+    def build(self, ids: List[str], documents: List[str], metadatas: List[dict]) -> None:
+        """(Re)build the index from scratch."""
+        postings = defaultdict(list)
+        lengths = []
+        for position, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((position, tf))
+
+        n = len(documents)
+        self._ids = list(ids)
+        self._documents = list(documents)
+        self._metadatas = list(metadatas)
+        self._lengths = lengths
+        self._avg_length = (sum(lengths) / n) if n else 0.0
+        self._postings = dict(postings)
+        self._idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+        self._positions = {chunk_id: position for position, chunk_id in enumerate(ids)}
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank chunks for a query.
+
+        Returns [(chunk_id, bm25_score)], best first, only chunks sharing at
+        least one term with the query.
+        """
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for position, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / self._avg_length)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self._ids[position], score) for position, score in ranked]
+
+    def document(self, chunk_id: str) -> Optional[Tuple[str, dict]]:
+        """Return (text, metadata) for an indexed chunk."""
+        position = self._positions.get(chunk_id)
+        if position is None:
+            return None
+        return self._documents[position], self._metadatas[position]
+
+    def __len__(self) -> int:
+        return len(self._ids)
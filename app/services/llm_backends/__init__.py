@@ -0,0 +1,16 @@
+"""
+LLM backends. Backends are imported lazily so the Gemini SDK is only loaded
+when it is actually selected (LLM_BACKEND=gemini).
+"""
+from app.services.llm_backends.base import LLMBackend, LLMChat
+
+
+def create_backend(name: str) -> LLMBackend:
+    """Instantiate the backend selected by name ("gemini" or "fake")."""
+    if name == "gemini":
+        from app.services.llm_backends.gemini import GeminiBackend
+        return GeminiBackend()
+    if name == "fake":
+        from app.services.llm_backends.fake import FakeBackend
+        return FakeBackend.from_settings()
+    raise ValueError(f"Unknown LLM backend: {name!r} (expected 'gemini' or 'fake')")
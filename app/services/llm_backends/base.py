@@ -0,0 +1,68 @@
+"""
+LLM backend interface.
+
+LLMService talks to the model only through these two classes, so the
+orchestrator, tool router and voice routes can run against any backend —
+Gemini in production, the scripted fake for load tests.
+
+Messages sent to a chat are either the context-enriched user message (str)
+or a batch of tool results: a list of (tool_name, result_dict) pairs.
+Replies are plain dicts:
+    {"text": str, "tool_calls": [{"name": str, "args": dict}], "usage_tokens": int}
+Streaming yields the same shape per chunk, with usage_tokens set on the last one.
+
+All methods are blocking; LLMService runs them in its executor.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Tuple, Type, Union
+
+ChatMessage = Union[str, List[Tuple[str, dict]]]
+
+
+class LLMChat(ABC):
+    """A multi-turn conversation that remembers its own history."""
+
+    @abstractmethod
+    def send(self, message: ChatMessage, allow_tools: bool = True) -> dict:
+        """Send a message and return the complete reply."""
+
+    @abstractmethod
+    def stream(self, message: ChatMessage, allow_tools: bool = True) -> Iterator[dict]:
+        """
+        Send a message and return an iterator over reply chunks.
+        The request itself is made before this returns, so request errors
+        surface here rather than on the first next().
+        """
+
+    @abstractmethod
+    def history_length(self) -> int:
+        """Number of entries currently held in the chat history."""
+
+    @abstractmethod
+    def replace_turn(self, turn_start: int, user_message: str, reply: str, max_messages: int) -> int:
+        """
+        Replace everything from history index turn_start onwards with a plain
+        user/assistant pair, keep only the last max_messages entries, and
+        return the new history length.
+        """
+
+
+class LLMBackend(ABC):
+    """Factory for chats against one model provider."""
+
+    name: str = "base"
+    # Exception types meaning "rate limited or temporarily down": these are
+    # retried with backoff and count toward the circuit breaker
+    retryable_errors: Tuple[Type[Exception], ...] = ()
+
+    @abstractmethod
+    def initialize(self, system_prompt: str) -> bool:
+        """Prepare the backend; return False if it cannot be used."""
+
+    @abstractmethod
+    def start_chat(self, history: List[dict]) -> LLMChat:
+        """Start a chat seeded with [{"role": "user"|"assistant", "content": str}] history."""
+
+    @property
+    def description(self) -> str:
+        return self.name
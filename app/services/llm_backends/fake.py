@@ -0,0 +1,243 @@
+"""
+Fake backend — deterministic local stand-in for the LLM, for load tests.
+
+Replies are driven by regex rules matched against the user message, with
+configurable latency, jitter and injected error rate, so throughput and tail
+latency of everything around the model can be measured without quota or
+network.
+
+Script format (JSON file at FAKE_LLM_SCRIPT; built-in DEFAULT_SCRIPT otherwise):
+    {
+      "rules": [
+        {"match": "regex", "reply": "text"},
+        {"match": "doctors? in (?P<department>\\w+)",
+         "tool_calls": [{"name": "search_doctors", "args": {"department": "{department}"}}],
+         "then": [[{"name": "get_department_info", "args": {"department_name": "{department}"}}]]}
+      ],
+      "default_reply": "text"
+    }
+
+Every rule with tool_calls that matches contributes its calls (so "my
+appointments and my bills" yields two calls); otherwise the first matching
+reply rule wins; otherwise the default reply is used. "{group}" placeholders
+in args are filled from named regex groups. "then" lists further tool-call
+batches emitted after each round of tool results, for multi-step flows.
+"""
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+from app.config import settings
+from app.services.llm_backends.base import ChatMessage, LLMBackend, LLMChat
+
+
+DEFAULT_SCRIPT = {
+    "rules": [
+        {"match": r"cancel.*?appointment\D*(?P<appointment_id>\d+)",
+         "tool_calls": [{"name": "cancel_appointment", "args": {"appointment_id": "{appointment_id}"}}]},
+        {"match": r"\b(my|upcoming|list)\b.*\bappointments?\b",
+         "tool_calls": [{"name": "list_appointments", "args": {}}]},
+        {"match": r"\b(bills?|billing|invoices?|payments?|outstanding)\b",
+         "tool_calls": [{"name": "get_billing_summary", "args": {}}]},
+        {"match": r"\b(reports?|lab|test results?)\b",
+         "tool_calls": [{"name": "check_report_status", "args": {}}]},
+        {"match": r"\bdoctors? (?:in|for|from) (?P<department>[a-z]+)",
+         "tool_calls": [{"name": "search_doctors", "args": {"department": "{department}"}}]},
+        {"match": r"\b(?P<department_name>[a-z]+) department\b",
+         "tool_calls": [{"name": "get_department_info", "args": {"department_name": "{department_name}"}}]},
+        {"match": r"^(hi|hello|hey)\b",
+         "reply": "Hello! I'm the CGH Assistant. How can I help you today?"},
+    ],
+    "default_reply": "Thanks for your question. Please contact our helpline at +91-11-2345-6789 for more details. "
+                     "Is there anything else I can help you with?",
+}
+
+
+class FakeLLMError(Exception):
+    """Injected 429-style failure; retryable, like a Gemini quota error."""
+
+
+class FakeChat(LLMChat):
+    """Scripted chat with simulated latency and failures."""
+
+    def __init__(self, backend: "FakeBackend", history: List[dict]):
+        self._backend = backend
+        self._history = list(history)
+        self._pending_steps: List[list] = []
+
+    def send(self, message: ChatMessage, allow_tools: bool = True) -> dict:
+        self._backend.simulate_request(fraction=1.0)
+        return self._respond(message, allow_tools)
+
+    def stream(self, message: ChatMessage, allow_tools: bool = True) -> Iterator[dict]:
+        # Time to first token is a fixed share of the total latency
+        total = self._backend.simulate_request(fraction=self._backend.first_token_fraction)
+        reply = self._respond(message, allow_tools)
+        return self._chunks(reply, total * (1 - self._backend.first_token_fraction))
+
+    def history_length(self) -> int:
+        return len(self._history)
+
+    def replace_turn(self, turn_start: int, user_message: str, reply: str, max_messages: int) -> int:
+        history = self._history[:turn_start]
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": reply})
+        self._history = history[-max_messages:]
+        return len(self._history)
+
+    def _respond(self, message: ChatMessage, allow_tools: bool) -> dict:
+        if isinstance(message, str):
+            self._history.append({"role": "user", "content": message})
+            reply = self._backend.reply_for(message, self)
+        else:
+            self._history.append({"role": "user", "content": json.dumps(message, default=str)})
+            reply = self._backend.reply_for_tool_results(message, self)
+
+        if not allow_tools and reply["tool_calls"]:
+            reply = {"text": self._backend.summarize([]), "tool_calls": []}
+        self._history.append({"role": "assistant", "content": reply["text"]})
+
+        reply["usage_tokens"] = (len(str(message)) + len(reply["text"])) // 4
+        return reply
+
+    @staticmethod
+    def _chunks(reply: dict, remaining_seconds: float) -> Iterator[dict]:
+        words = re.findall(r"\S+\s*", reply["text"]) or [""]
+        delay = remaining_seconds / len(words)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(delay)
+            last = i == len(words) - 1
+            yield {
+                "text": word,
+                "tool_calls": reply["tool_calls"] if last else [],
+                "usage_tokens": reply["usage_tokens"] if last else 0,
+            }
+
+
+class FakeBackend(LLMBackend):
+    """Rule-driven stand-in backend (LLM_BACKEND=fake)."""
+
+    name = "fake"
+    retryable_errors = (FakeLLMError,)
+
+    def __init__(
+        self,
+        script: Optional[dict] = None,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        first_token_fraction: float = 0.3,
+    ):
+        self.script = script or DEFAULT_SCRIPT
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.first_token_fraction = first_token_fraction
+        self._random = random.Random(seed)
+        self._rules = [
+            (re.compile(rule["match"], re.IGNORECASE), rule)
+            for rule in self.script.get("rules", [])
+        ]
+
+    @classmethod
+    def from_settings(cls) -> "FakeBackend":
+        script = None
+        if settings.FAKE_LLM_SCRIPT:
+            script = json.loads(Path(settings.FAKE_LLM_SCRIPT).read_text(encoding="utf-8"))
+        return cls(
+            script=script,
+            latency_ms=settings.FAKE_LLM_LATENCY_MS,
+            jitter_ms=settings.FAKE_LLM_JITTER_MS,
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            seed=settings.FAKE_LLM_SEED,
+        )
+
+    def initialize(self, system_prompt: str) -> bool:
+        return True
+
+    def start_chat(self, history: List[dict]) -> FakeChat:
+        return FakeChat(self, history)
+
+    @property
+    def description(self) -> str:
+        return (
+            f"fake ({len(self._rules)} rules, {self.latency_ms:.0f}±{self.jitter_ms:.0f} ms, "
+            f"{self.error_rate:.0%} errors)"
+        )
+
+    # ── Simulation ──
+
+    def simulate_request(self, fraction: float) -> float:
+        """Sleep for `fraction` of one sampled request latency; maybe raise. Returns the full latency."""
+        latency = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        time.sleep(latency * fraction)
+        if self._random.random() < self.error_rate:
+            raise FakeLLMError("429 Resource exhausted (injected by fake LLM backend)")
+        return latency
+
+    # ── Scripted replies ──
+
+    def reply_for(self, context_message: str, chat: FakeChat) -> dict:
+        user_message = context_message.rsplit("[USER MESSAGE]", 1)[-1].strip()
+        tool_calls = []
+        text_reply = None
+        chat._pending_steps = []
+
+        for pattern, rule in self._rules:
+            match = pattern.search(user_message)
+            if not match:
+                continue
+            groups = match.groupdict()
+            if "tool_calls" in rule:
+                tool_calls.extend(self._fill(tc, groups) for tc in rule["tool_calls"])
+                chat._pending_steps.extend(
+                    [self._fill(tc, groups) for tc in step] for step in rule.get("then", [])
+                )
+            elif text_reply is None and "reply" in rule:
+                text_reply = rule["reply"]
+
+        if tool_calls:
+            return {"text": "", "tool_calls": tool_calls}
+        if text_reply is None:
+            text_reply = self._faq_reply(context_message)
+        return {"text": text_reply, "tool_calls": []}
+
+    def reply_for_tool_results(self, tool_results: list, chat: FakeChat) -> dict:
+        if chat._pending_steps:
+            return {"text": "", "tool_calls": chat._pending_steps.pop(0)}
+        return {"text": self.summarize(tool_results), "tool_calls": []}
+
+    def summarize(self, tool_results: list) -> str:
+        if not tool_results:
+            return "Here is what I could find so far. Is there anything else I can help you with?"
+        lines = ["Here's what I found:"]
+        for name, result in tool_results:
+            detail = result.get("message") if isinstance(result, dict) else None
+            lines.append(f"- {name}: {detail or json.dumps(result, default=str)[:300]}")
+        lines.append("Is there anything else I can help you with?")
+        return "\n".join(lines)
+
+    def _faq_reply(self, context_message: str) -> str:
+        """Echo the top knowledge base chunk, so prompt size drives reply size like a real model."""
+        marker = "[HOSPITAL KNOWLEDGE BASE - Use this to answer questions]"
+        if marker in context_message:
+            kb = context_message.split(marker, 1)[1]
+            chunk = kb.split("---", 1)[0].strip().split("\n", 1)[-1]
+            return f"According to our hospital information: {chunk[:400]}\n\nIs there anything else I can help you with?"
+        return self.script.get("default_reply", DEFAULT_SCRIPT["default_reply"])
+
+    @staticmethod
+    def _fill(tool_call: dict, groups: dict) -> dict:
+        """Substitute "{group}" placeholders in tool args; whole-number values become ints."""
+        args = {}
+        for key, value in tool_call.get("args", {}).items():
+            if isinstance(value, str):
+                value = value.format(**{k: v or "" for k, v in groups.items()})
+                if value.isdigit():
+                    value = int(value)
+            args[key] = value
+        return {"name": tool_call["name"], "args": args}
@@ -0,0 +1,249 @@
+"""
+Gemini backend — google.generativeai chat sessions with function calling.
+"""
+from typing import Iterator, List
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from app.config import settings
+from app.services.llm_backends.base import ChatMessage, LLMBackend, LLMChat
+
+
+# ── Tool Declarations for Gemini ─────────────────────
+
+TOOL_DECLARATIONS = [
+    genai.protos.Tool(
+        function_declarations=[
+            genai.protos.FunctionDeclaration(
+                name="search_doctors",
+                description="Search for doctors at the hospital. Can filter by department name, doctor name, or specialization. At least one parameter should be provided.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "department": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Department name to filter by (e.g., 'Cardiology', 'Pediatrics')",
+                        ),
+                        "name": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Doctor name or partial name to search for",
+                        ),
+                        "specialization": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Specialization to search for (e.g., 'Joint Replacement')",
+                        ),
+                    },
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="get_department_info",
+                description="Get information about a specific hospital department including timings, floor, and services. Available to all users.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "department_name": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Name of the department (e.g., 'Cardiology')",
+                        ),
+                    },
+                    required=["department_name"],
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="book_appointment",
+                description="Book an appointment with a doctor for the verified patient. Requires login.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "doctor_name": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Full name of the doctor (e.g., 'Dr. Ananya Sharma')",
+                        ),
+                        "date": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Appointment date in YYYY-MM-DD format",
+                        ),
+                        "time_slot": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Preferred time slot (e.g., '10:00 AM', '2:30 PM')",
+                        ),
+                        "reason": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description="Reason for the appointment",
+                        ),
+                    },
+                    required=["doctor_name", "date", "time_slot"],
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="cancel_appointment",
+                description="Cancel an existing appointment for the verified patient. Requires login.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "appointment_id": genai.protos.Schema(
+                            type=genai.protos.Type.INTEGER,
+                            description="ID of the appointment to cancel",
+                        ),
+                    },
+                    required=["appointment_id"],
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="list_appointments",
+                description="List all upcoming appointments for the verified patient. Requires login.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={},
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="check_report_status",
+                description="Check the status of lab reports for the verified patient. Requires login.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={},
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name="get_billing_summary",
+                description="Get billing summary and outstanding amounts for the verified patient. Requires login.",
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={},
+                ),
+            ),
+        ]
+    )
+]
+
+
+# Disables function calling for a single request, forcing a text answer
+NO_TOOLS_CONFIG = genai.protos.ToolConfig(
+    function_calling_config=genai.protos.FunctionCallingConfig(
+        mode=genai.protos.FunctionCallingConfig.Mode.NONE,
+    )
+)
+
+
+class GeminiChat(LLMChat):
+    """Wraps a genai ChatSession."""
+
+    def __init__(self, chat):
+        self._chat = chat
+
+    def send(self, message: ChatMessage, allow_tools: bool = True) -> dict:
+        response = self._chat.send_message(
+            self._to_content(message),
+            tool_config=None if allow_tools else NO_TOOLS_CONFIG,
+        )
+        reply = self._parse(response)
+        reply["usage_tokens"] = self._usage_tokens(response)
+        return reply
+
+    def stream(self, message: ChatMessage, allow_tools: bool = True) -> Iterator[dict]:
+        response = self._chat.send_message(
+            self._to_content(message),
+            stream=True,
+            tool_config=None if allow_tools else NO_TOOLS_CONFIG,
+        )
+        return self._iter_chunks(response)
+
+    def history_length(self) -> int:
+        return len(self._chat.history)
+
+    def replace_turn(self, turn_start: int, user_message: str, reply: str, max_messages: int) -> int:
+        # Accessing history raises if the last response was incomplete or blocked
+        history = list(self._chat.history[:turn_start])
+        history.append({"role": "user", "parts": [user_message]})
+        history.append({"role": "model", "parts": [reply]})
+        history = history[-max_messages:]
+        self._chat.history = history
+        return len(history)
+
+    def _iter_chunks(self, response) -> Iterator[dict]:
+        for chunk in response:
+            reply = self._parse(chunk)
+            reply["usage_tokens"] = 0
+            yield reply
+        yield {"text": "", "tool_calls": [], "usage_tokens": self._usage_tokens(response)}
+
+    @staticmethod
+    def _to_content(message: ChatMessage):
+        """Plain text as is; tool results as one content with a FunctionResponse part each."""
+        if isinstance(message, str):
+            return message
+        return genai.protos.Content(
+            parts=[
+                genai.protos.Part(
+                    function_response=genai.protos.FunctionResponse(
+                        name=tool_name,
+                        response={"result": tool_result},
+                    )
+                )
+                for tool_name, tool_result in message
+            ]
+        )
+
+    @staticmethod
+    def _parse(response) -> dict:
+        """Collect text and function calls from a (chunk of a) Gemini response."""
+        text = ""
+        tool_calls = []
+        for candidate in response.candidates:
+            for part in candidate.content.parts:
+                if part.function_call:
+                    fc = part.function_call
+                    tool_calls.append({
+                        "name": fc.name,
+                        "args": dict(fc.args) if fc.args else {},
+                    })
+                elif part.text:
+                    text += part.text
+        return {"text": text, "tool_calls": tool_calls}
+
+    @staticmethod
+    def _usage_tokens(response) -> int:
+        """Actual tokens billed for a response, if Gemini reported usage."""
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", 0) or 0
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai."""
+
+    name = "gemini"
+    retryable_errors = (
+        google_exceptions.ResourceExhausted,     # 429 quota
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,    # 503
+        google_exceptions.InternalServerError,   # 500
+        google_exceptions.DeadlineExceeded,      # 504
+    )
+
+    def __init__(self):
+        self._model = None
+
+    def initialize(self, system_prompt: str) -> bool:
+        if not settings.GEMINI_API_KEY:
+            print("WARNING: GEMINI_API_KEY not set! LLM service will not work.")
+            return False
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+
+        self._model = genai.GenerativeModel(
+            model_name=settings.GEMINI_MODEL,
+            system_instruction=system_prompt,
+            tools=TOOL_DECLARATIONS,
+        )
+        return True
+
+    def start_chat(self, history: List[dict]) -> GeminiChat:
+        gemini_history = []
+        for msg in history:
+            role = "user" if msg["role"] == "user" else "model"
+            gemini_history.append({"role": role, "parts": [msg["content"]]})
+        return GeminiChat(self._model.start_chat(history=gemini_history))
+
+    @property
+    def description(self) -> str:
+        return f"gemini ({settings.GEMINI_MODEL})"
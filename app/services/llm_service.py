@@ -1,9 +1,14 @@
 import json
 import asyncio
-import time
-from typing import Optional, List
-import google.generativeai as genai
+from typing import AsyncIterator, Optional, List, Tuple
 from app.config import settings
+from app.services.chat_cache import ChatCache, CachedChat
+from app.services.deadline import Deadline, DeadlineExceeded
+from app.services.executors import llm_executor
+from app.services.llm_backends import LLMBackend, LLMChat, create_backend
+from app.services.metrics import metrics
+from app.services.rate_governor import llm_governor, is_retryable_error
+from app.services.session_store import SessionRecord
 
 
 # ── System Prompt ────────────────────────────────────
@@ -45,140 +50,88 @@ Current user status will be provided in each message. Use tools only when approp
 """
 
 
-# ── Tool Declarations for Gemini ─────────────────────
-
-TOOL_DECLARATIONS = [
-    genai.protos.Tool(
-        function_declarations=[
-            genai.protos.FunctionDeclaration(
-                name="search_doctors",
-                description="Search for doctors at the hospital. Can filter by department name, doctor name, or specialization. At least one parameter should be provided.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "department": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Department name to filter by (e.g., 'Cardiology', 'Pediatrics')",
-                        ),
-                        "name": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Doctor name or partial name to search for",
-                        ),
-                        "specialization": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Specialization to search for (e.g., 'Joint Replacement')",
-                        ),
-                    },
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="get_department_info",
-                description="Get information about a specific hospital department including timings, floor, and services. Available to all users.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "department_name": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Name of the department (e.g., 'Cardiology')",
-                        ),
-                    },
-                    required=["department_name"],
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="book_appointment",
-                description="Book an appointment with a doctor for the verified patient. Requires login.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "doctor_name": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Full name of the doctor (e.g., 'Dr. Ananya Sharma')",
-                        ),
-                        "date": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Appointment date in YYYY-MM-DD format",
-                        ),
-                        "time_slot": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Preferred time slot (e.g., '10:00 AM', '2:30 PM')",
-                        ),
-                        "reason": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Reason for the appointment",
-                        ),
-                    },
-                    required=["doctor_name", "date", "time_slot"],
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="cancel_appointment",
-                description="Cancel an existing appointment for the verified patient. Requires login.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "appointment_id": genai.protos.Schema(
-                            type=genai.protos.Type.INTEGER,
-                            description="ID of the appointment to cancel",
-                        ),
-                    },
-                    required=["appointment_id"],
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="list_appointments",
-                description="List all upcoming appointments for the verified patient. Requires login.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={},
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="check_report_status",
-                description="Check the status of lab reports for the verified patient. Requires login.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={},
-                ),
-            ),
-            genai.protos.FunctionDeclaration(
-                name="get_billing_summary",
-                description="Get billing summary and outstanding amounts for the verified patient. Requires login.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={},
-                ),
-            ),
-        ]
-    )
-]
-
-
 class LLMService:
-    """Gemini LLM integration with tool calling support."""
+    """LLM integration with tool calling support, independent of the model backend."""
 
-    def __init__(self):
-        self._model = None
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self._backend = backend
         self._initialized = False
+        self._chats = ChatCache(
+            max_size=settings.LLM_CHAT_CACHE_SIZE,
+            ttl_seconds=settings.SESSION_TIMEOUT_MINUTES * 60,
+        )
 
     def initialize(self):
-        """Initialize the Gemini model."""
+        """Initialize the configured LLM backend."""
         if self._initialized:
             return
 
-        if not settings.GEMINI_API_KEY:
-            print("WARNING: GEMINI_API_KEY not set! LLM service will not work.")
+        if self._backend is None:
+            self._backend = create_backend(settings.LLM_BACKEND)
+
+        if not self._backend.initialize(SYSTEM_PROMPT):
             return
 
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._initialized = True
+        print(f"LLM service initialized with backend: {self._backend.description}")
+
+    # ── Per-session chats ──
 
-        self._model = genai.GenerativeModel(
-            model_name=settings.GEMINI_MODEL,
-            system_instruction=SYSTEM_PROMPT,
-            tools=TOOL_DECLARATIONS,
+    def open_chat(self, session: SessionRecord, conversation_history: List[dict], reuse: bool = True) -> Optional[CachedChat]:
+        """
+        Check out the live chat for a session at the start of a turn.
+
+        Reuses the cached chat when it still mirrors the session history
+        (unless reuse=False); otherwise builds a new one from conversation_history.
+        Pass the returned handle to the generate_* calls of this turn and hand
+        it back with close_chat.
+        """
+        if not self._initialized:
+            return None
+
+        entry = self._chats.checkout(session)
+        if entry is not None and reuse:
+            metrics.increment("llm_chat_cache_hits")
+            entry.turn_start = entry.window_len
+            return entry
+
+        metrics.increment("llm_chat_cache_misses")
+        return CachedChat(
+            session_id=session["session_id"],
+            chat=self._backend.start_chat(conversation_history),
+            epoch=session.get("history_epoch", 0),
+            message_count=session.get("message_count", 1) - 1,
+            window_len=len(conversation_history),
         )
-        self._initialized = True
-        print(f"LLM service initialized with model: {settings.GEMINI_MODEL}")
+
+    def close_chat(self, entry: Optional[CachedChat], session: SessionRecord, user_message: str, reply: str) -> None:
+        """
+        Finish a turn: collapse it to a plain user/model pair (dropping the RAG
+        context and any function call traffic), trim to the history window and
+        return the chat to the cache. Call after the reply is added to the session.
+        """
+        if entry is None:
+            return
+        try:
+            entry.window_len = entry.chat.replace_turn(
+                entry.turn_start, user_message, reply, settings.LLM_HISTORY_MESSAGES
+            )
+        except Exception as e:
+            # Incomplete or blocked response — let the next turn rebuild
+            print(f"LLM chat discarded for session {entry.session_id[:8]}...: {e}")
+            return
+
+        entry.turn_start = entry.window_len
+        entry.message_count = session.get("message_count", 0)
+        entry.epoch = session.get("history_epoch", 0)
+        self._chats.checkin(entry)
+        metrics.set_gauge("llm_chat_cache_size", len(self._chats))
+
+    def _chat_for(self, chat: Optional[CachedChat], conversation_history: List[dict]) -> LLMChat:
+        """Return the backend chat for this call — the live one if given, else a fresh one."""
+        if chat is not None:
+            return chat.chat
+        return self._backend.start_chat(conversation_history)
 
     def build_context_message(
         self,
@@ -223,136 +176,308 @@ class LLMService:
         session: dict,
         rag_context: List[dict],
         conversation_history: List[dict],
+        chat: Optional[CachedChat] = None,
+        deadline: Optional[Deadline] = None,
     ) -> dict:
         """
-        Generate a response from Gemini.
+        Generate a response from the LLM.
+        With a deadline, the call (queueing and retries included) must finish
+        within the remaining budget or the error fallback is returned.
 
         Returns:
             {
                 "response": str,           # The text response
                 "tool_calls": list[dict],   # Any tool calls requested
+                "error": bool,              # Only present (True) on fallback messages
             }
         """
-        if not self._initialized or not self._model:
+        if not self._initialized:
             return {
                 "response": "I'm sorry, the AI service is not available right now. "
                             "Please try again later or call +91-11-2345-6789 for assistance.",
                 "tool_calls": [],
+                "error": True,
             }
 
-        # Build conversation for Gemini
-        gemini_history = []
-        for msg in conversation_history:
-            role = "user" if msg["role"] == "user" else "model"
-            gemini_history.append({"role": role, "parts": [msg["content"]]})
-
-        # Create chat session with history
-        chat = self._model.start_chat(history=gemini_history)
+        # Reuse the session's live chat, or create one with history
+        llm_chat = self._chat_for(chat, conversation_history)
 
         # Build the context-enriched message
         context_message = self.build_context_message(user_message, session, rag_context)
 
-        loop = asyncio.get_event_loop()
+        try:
+            # Admission-controlled, retried backend call (runs in executor)
+            reply = await self._call(
+                llm_chat.send,
+                context_message,
+                est_tokens=self._estimate_tokens(context_message, conversation_history),
+                deadline=deadline,
+            )
+            return {
+                "response": reply["text"],
+                "tool_calls": reply["tool_calls"],
+            }
+
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            return {
+                "response": "I encountered an issue processing your request. "
+                            "Please try again or call our helpline at +91-11-2345-6789.",
+                "tool_calls": [],
+                "error": True,
+            }
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Run synchronous Gemini call in executor to avoid blocking async loop
-                response = await loop.run_in_executor(
-                    None, chat.send_message, context_message
-                )
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        session: dict,
+        rag_context: List[dict],
+        conversation_history: List[dict],
+        chat: Optional[CachedChat] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a response from the LLM as it is generated.
 
-                # Check for tool calls
-                tool_calls = []
-                response_text = ""
-
-                for candidate in response.candidates:
-                    for part in candidate.content.parts:
-                        if part.function_call:
-                            fc = part.function_call
-                            tool_calls.append({
-                                "name": fc.name,
-                                "args": dict(fc.args) if fc.args else {},
-                            })
-                        elif part.text:
-                            response_text += part.text
-
-                return {
-                    "response": response_text,
-                    "tool_calls": tool_calls,
-                }
+        Yields:
+            {"text": str}                          # incremental text deltas
+            {"done": True, "response": str, "tool_calls": list[dict]}   # final event
+        """
+        if not self._initialized:
+            result = await self.generate_response(
+                user_message, session, rag_context, conversation_history
+            )
+            yield {"text": result["response"]}
+            yield {"done": True, **result}
+            return
 
-            except Exception as e:
-                error_str = str(e).lower()
-                print(f"LLM Error (attempt {attempt + 1}/{max_retries}): {e}")
+        llm_chat = self._chat_for(chat, conversation_history)
+        context_message = self.build_context_message(user_message, session, rag_context)
+
+        response_text = ""
+        tool_calls = []
+        try:
+            async for chunk in self._stream_chunks(
+                llm_chat,
+                context_message,
+                self._estimate_tokens(context_message, conversation_history),
+                deadline=deadline,
+            ):
+                tool_calls.extend(chunk["tool_calls"])
+                if chunk["text"]:
+                    response_text += chunk["text"]
+                    yield {"text": chunk["text"]}
+        except Exception as e:
+            print(f"LLM Error (stream): {e}")
+            if not response_text and not tool_calls:
+                # Nothing reached the client yet — fall back to the retrying path
+                result = await self.generate_response(
+                    user_message, session, rag_context, conversation_history, deadline=deadline
+                )
+                if result["response"]:
+                    yield {"text": result["response"]}
+                yield {"done": True, **result}
+                return
 
-                # Retry on rate limit / quota / resource errors
-                if attempt < max_retries - 1 and any(
-                    keyword in error_str
-                    for keyword in ["429", "rate", "quota", "resource", "exhausted", "limit"]
-                ):
-                    wait_time = (attempt + 1) * 10  # 10s, 20s
-                    print(f"  Rate limited — retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-
-                return {
-                    "response": "I encountered an issue processing your request. "
-                                "Please try again or call our helpline at +91-11-2345-6789.",
-                    "tool_calls": [],
-                }
+        yield {"done": True, "response": response_text, "tool_calls": tool_calls}
 
     async def generate_with_tool_result(
         self,
         conversation_history: List[dict],
-        tool_name: str,
-        tool_result: dict,
-    ) -> str:
-        """
-        Send tool result back to Gemini and get the final natural language response.
+        tool_results: List[Tuple[str, dict]],
+        chat: Optional[CachedChat] = None,
+        allow_tools: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
         """
-        if not self._initialized or not self._model:
-            return "Service temporarily unavailable."
+        Send tool results back to the LLM and get its next step.
+        All results of the hop go back in one message, one function response each.
+        With allow_tools=False function calling is disabled, forcing a text answer.
 
-        # Rebuild chat with history
-        gemini_history = []
-        for msg in conversation_history:
-            role = "user" if msg["role"] == "user" else "model"
-            gemini_history.append({"role": role, "parts": [msg["content"]]})
+        Returns:
+            {
+                "response": str,           # The text response
+                "tool_calls": list[dict],   # Any follow-up tool calls requested
+            }
+        """
+        if not self._initialized:
+            return {"response": "Service temporarily unavailable.", "tool_calls": []}
 
-        chat = self._model.start_chat(history=gemini_history)
+        llm_chat = self._chat_for(chat, conversation_history)
 
         try:
-            loop = asyncio.get_event_loop()
-
-            # Build the function response content
-            tool_response_content = genai.protos.Content(
-                parts=[
-                    genai.protos.Part(
-                        function_response=genai.protos.FunctionResponse(
-                            name=tool_name,
-                            response={"result": tool_result},
-                        )
-                    )
-                ]
+            reply = await self._call(
+                llm_chat.send,
+                tool_results,
+                est_tokens=self._estimate_tokens(self._raw_results(tool_results), conversation_history),
+                allow_tools=allow_tools,
+                deadline=deadline,
             )
 
-            # Run synchronous Gemini call in executor
-            response = await loop.run_in_executor(
-                None, chat.send_message, tool_response_content
-            )
+            response_text = reply["text"]
+            tool_calls = reply["tool_calls"]
+            if not response_text and not tool_calls:
+                response_text = "I processed your request but couldn't generate a response. Please try again."
+            return {"response": response_text, "tool_calls": tool_calls}
+
+        except Exception as e:
+            print(f"LLM Error (tool result): {e}")
+            return {
+                "response": f"I got the result but had trouble formatting the response. Here's the raw data: {self._raw_results(tool_results)}",
+                "tool_calls": [],
+            }
+
+    async def stream_with_tool_result(
+        self,
+        conversation_history: List[dict],
+        tool_results: List[Tuple[str, dict]],
+        chat: Optional[CachedChat] = None,
+        allow_tools: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Streaming variant of generate_with_tool_result.
+
+        Yields {"text": str} deltas, then {"done": True, "response": str, "tool_calls": list[dict]}.
+        """
+        if not self._initialized:
+            result = {"response": "Service temporarily unavailable.", "tool_calls": []}
+            yield {"text": result["response"]}
+            yield {"done": True, **result}
+            return
 
-            # Extract text response
-            for candidate in response.candidates:
-                for part in candidate.content.parts:
-                    if part.text:
-                        return part.text
+        llm_chat = self._chat_for(chat, conversation_history)
 
-            return "I processed your request but couldn't generate a response. Please try again."
+        response_text = ""
+        tool_calls = []
+        try:
+            async for chunk in self._stream_chunks(
+                llm_chat,
+                tool_results,
+                self._estimate_tokens(self._raw_results(tool_results), conversation_history),
+                allow_tools=allow_tools,
+                deadline=deadline,
+            ):
+                tool_calls.extend(chunk["tool_calls"])
+                if chunk["text"]:
+                    response_text += chunk["text"]
+                    yield {"text": chunk["text"]}
+        except Exception as e:
+            print(f"LLM Error (tool result stream): {e}")
+            if not response_text:
+                response_text = f"I got the result but had trouble formatting the response. Here's the raw data: {self._raw_results(tool_results)}"
+                tool_calls = []
+                yield {"text": response_text}
+
+        if not response_text and not tool_calls:
+            response_text = "I processed your request but couldn't generate a response. Please try again."
+            yield {"text": response_text}
+
+        yield {"done": True, "response": response_text, "tool_calls": tool_calls}
+
+    # ── Helpers ──
 
+    @staticmethod
+    def _raw_results(tool_results: List[Tuple[str, dict]]) -> str:
+        """Format tool results as JSON for the fallback reply."""
+        if len(tool_results) == 1:
+            return json.dumps(tool_results[0][1], indent=2, default=str)
+        return json.dumps({name: result for name, result in tool_results}, indent=2, default=str)
+
+    async def _call(self, send, message, est_tokens: int, deadline: Optional[Deadline] = None, **kwargs):
+        """
+        Run a blocking backend call in the LLM executor under the rate governor.
+
+        Retryable failures (rate limit, quota, transient server errors) are
+        retried with jittered exponential backoff and counted by the circuit
+        breaker; while the breaker is open, calls fail immediately.
+        With a deadline, queueing, the call itself and any retries are bounded
+        by the remaining budget and DeadlineExceeded is raised when it runs out.
+        """
+        max_retries = settings.LLM_MAX_RETRIES
+        for attempt in range(max_retries):
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded("No budget left for the LLM call")
+            await llm_governor.acquire(est_tokens, timeout=deadline.remaining() if deadline else None)
+            try:
+                result = await self._within(llm_executor.run(send, message, **kwargs), deadline)
+            except DeadlineExceeded:
+                # Our budget ran out, not the API's fault — free a half-open probe slot
+                llm_governor.breaker.release()
+                raise
+            except Exception as e:
+                retryable = is_retryable_error(e, self._backend.retryable_errors)
+                if retryable:
+                    llm_governor.breaker.record_failure()
+                    metrics.increment("llm_retryable_errors")
+                else:
+                    # The API answered, so it is healthy even though this call failed
+                    llm_governor.breaker.record_success()
+                print(f"LLM Error (attempt {attempt + 1}/{max_retries}): {e}")
+                if not retryable or attempt == max_retries - 1:
+                    raise
+                delay = llm_governor.backoff_delay(attempt)
+                if deadline is not None and delay >= deadline.remaining():
+                    raise
+                print(f"  Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                continue
+
+            llm_governor.breaker.record_success()
+            if isinstance(result, dict):
+                llm_governor.reconcile(est_tokens, result.get("usage_tokens", 0))
+            return result
+
+    async def _stream_chunks(
+        self,
+        llm_chat: LLMChat,
+        message,
+        est_tokens: int,
+        allow_tools: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Start a streamed reply and yield its chunks as they arrive.
+        Backend iterators are blocking, so each chunk is pulled in the LLM executor.
+        """
+        chunks = await self._call(
+            llm_chat.stream, message, est_tokens=est_tokens, deadline=deadline, allow_tools=allow_tools
+        )
+        usage = 0
+        try:
+            while True:
+                chunk = await self._within(llm_executor.run(next, chunks, _STREAM_DONE), deadline)
+                if chunk is _STREAM_DONE:
+                    break
+                usage = chunk.get("usage_tokens") or usage
+                yield chunk
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            print(f"LLM Error (tool result): {e}")
-            return f"I got the result but had trouble formatting the response. Here's the raw data: {json.dumps(tool_result, indent=2)}"
+            if is_retryable_error(e, self._backend.retryable_errors):
+                llm_governor.breaker.record_failure()
+            raise
+        llm_governor.reconcile(est_tokens, usage)
+
+    @staticmethod
+    async def _within(awaitable, deadline: Optional[Deadline]):
+        """Await a backend call, giving up with DeadlineExceeded once the budget is spent."""
+        if deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("LLM call ran past the request deadline")
+
+    @staticmethod
+    def _estimate_tokens(message: str, conversation_history: List[dict]) -> int:
+        """Rough token estimate (~4 chars/token) for quota accounting, including the reply."""
+        chars = len(message) + sum(len(msg["content"]) for msg in conversation_history)
+        return chars // 4 + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+# Sentinel returned by next() once a streamed reply is exhausted
+_STREAM_DONE = object()
 
 
 # Global LLM service instance
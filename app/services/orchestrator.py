@@ -1,30 +1,88 @@
-import json
-from typing import Optional
+import re
+import time
+import asyncio
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Optional
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.services.session_store import session_store
 from app.services.rag_service import rag_service
 from app.services.llm_service import llm_service
+from app.services.chat_cache import CachedChat
+from app.services.deadline import Deadline, DeadlineExceeded
 from app.services.tool_router import tool_router
+from app.services.answer_cache import answer_cache
+from app.services.intent import classify as classify_intent, needs_retrieval
+from app.services.executors import blocking_executor
+from app.services.singleflight import SingleFlight
 from app.services.metrics import metrics
 from app.guardrails import check_input_safety, check_response_safety
 from app.logger import logger
 
 
+# Async callback that receives incremental reply text for streaming clients
+ChunkCallback = Callable[[str], Awaitable[None]]
+
+
+class _ChunkRelay:
+    """
+    Forwards streamed LLM text to the client with response guardrails applied.
+    Text is released only up to the last whitespace so redaction patterns
+    (patient codes, phone numbers) are never split across two chunks.
+    """
+
+    def __init__(self, on_chunk: ChunkCallback, user_type: str):
+        self._on_chunk = on_chunk
+        self._user_type = user_type
+        self._pending = ""
+
+    async def feed(self, text: str) -> None:
+        self._pending += text
+        cut = max(self._pending.rfind(" "), self._pending.rfind("\n"))
+        if cut < 0:
+            return
+        ready, self._pending = self._pending[:cut + 1], self._pending[cut + 1:]
+        await self._on_chunk(check_response_safety(ready, self._user_type))
+
+    async def flush(self) -> None:
+        if self._pending:
+            await self._on_chunk(check_response_safety(self._pending, self._user_type))
+            self._pending = ""
+
+
 class Orchestrator:
     """
     Central conversation controller.
     Ties together: session → RAG → LLM → tools → response.
     """
 
+    def __init__(self):
+        self._guest_flights = SingleFlight("guest_llm")
+        self._retrievals = 0
+        self._retrieval_skips = 0
+
     async def process_message(
         self,
         user_message: str,
         session_id: Optional[str],
         db: Session,
+        on_chunk: Optional[ChunkCallback] = None,
+        deadline: Optional[Deadline] = None,
     ) -> dict:
         """
         Process a user message through the full pipeline.
 
+        If on_chunk is given, the reply is streamed: each text delta is awaited
+        through the callback as Gemini produces it, and the returned dict
+        carries the complete reply once generation has finished.
+
+        If deadline is given, every stage works within the remaining budget:
+        RAG is skipped, history shortened and the tool loop cut short as
+        needed, and a holding answer is returned if the reply is not ready
+        DEADLINE_HOLDING_MARGIN_SECONDS before the deadline — unless a write
+        tool has started, in which case the turn is finished late (see
+        _produce_within).
+
         Returns:
             {
                 "reply": str,
@@ -34,98 +92,429 @@ class Orchestrator:
             }
         """
         # 1. Get or create session
-        session = session_store.get_or_create_session(session_id)
+        session = await session_store.get_or_create_session(session_id)
         sid = session["session_id"]
 
         # 2. Check input safety
         is_safe, warning = check_input_safety(user_message)
 
-        # 3. Add user message to history
-        session_store.add_message(sid, "user", user_message)
+        # 3. Add user message to history (keeping the updated session)
+        session = await session_store.add_message(sid, "user", user_message) or session
 
-        # 4. Retrieve RAG context (guests only see public docs)
+        # 4. Retrieve RAG context (guests only see public docs), unless the
+        # message plainly needs none. Retrieval runs while history is assembled.
         access_level = "all" if session.get("verified") else "public"
-        with metrics.timer("rag_latency_ms"):
-            rag_context = rag_service.retrieve(user_message, top_k=4, access_level=access_level)
+        retrieve = self._needs_retrieval(user_message, session)
+        # Only a guest's opening question is answerable without history, so
+        # only those may share cached answers across sessions
+        use_answer_cache = (
+            retrieve
+            and settings.ANSWER_CACHE_ENABLED
+            and not session.get("verified")
+            and session.history_len == 1
+        )
+        retrieval = None
+        if retrieve:
+            retrieval = asyncio.create_task(
+                self._timed_retrieve(user_message, access_level, use_answer_cache, deadline)
+            )
+            await asyncio.sleep(0)  # let retrieval reach the executor before the synchronous work below
 
         # 5. Get conversation history
-        history = session_store.get_history(sid)
         # Only pass the last few turns to LLM (exclude the current message which we just added)
-        recent_history = history[:-1][-10:]  # last 5 exchanges (10 messages)
-
-        # 6. Call LLM
-        with metrics.timer("llm_latency_ms"):
-            llm_result = await llm_service.generate_response(
-                user_message=user_message,
-                session=session,
-                rag_context=rag_context,
-                conversation_history=recent_history,
-            )
+        recent_history = session.history_window(settings.LLM_HISTORY_MESSAGES + 1)[:-1]  # last 5 exchanges (10 messages)
+        reuse_chat = True
+        if deadline is not None and len(recent_history) > 2:
+            # Budget left once retrieval (bounded by DEADLINE_RAG_MAX_SECONDS) is done
+            remaining = deadline.remaining() - (settings.DEADLINE_RAG_MAX_SECONDS if retrieve else 0.0)
+            if remaining < settings.DEADLINE_SHORT_HISTORY_SECONDS:
+                # Running low on budget — a shorter prompt answers faster
+                recent_history = recent_history[-2:]
+                reuse_chat = False
+                deadline.degrade("history_shortened")
+        chat = llm_service.open_chat(session, recent_history, reuse=reuse_chat)
+
+        query_embedding, rag_context = (await retrieval) if retrieval is not None else (None, [])
+        use_answer_cache = use_answer_cache and query_embedding is not None and bool(rag_context)
+
+        cached_reply = None
+        if use_answer_cache:
+            cached_reply = answer_cache.get(query_embedding, rag_context, rag_service.index_version)
+
+        # 6. Generate the reply (reusing the session's live chat when it is still in sync)
+        if cached_reply is not None:
+            # Served from the answer cache — no LLM call needed
+            response_text = cached_reply
+            if on_chunk:
+                await on_chunk(response_text)
+        else:
+            async def generate() -> dict:
+                return await self._generate_reply(
+                    user_message, session, rag_context, recent_history, db, on_chunk, chat, deadline
+                )
+
+            async def produce() -> tuple:
+                if settings.LLM_COALESCE_GUEST_REQUESTS and not session.get("verified"):
+                    # Identical concurrent guest requests share one LLM call
+                    key = self._coalesce_key(user_message, access_level, rag_context, recent_history)
+                    return await self._guest_flights.do(key, generate)
+                return await generate(), False
+
+            try:
+                if deadline is None:
+                    result, shared = await produce()
+                else:
+                    result, shared = await self._produce_within(produce, deadline)
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                # Out of budget — answer now; the half-finished chat is dropped
+                deadline.degrade("holding_answer")
+                result, shared = {"reply": _HOLDING_ANSWER, "cacheable": False}, False
+                chat = None
+            if shared and on_chunk:
+                await on_chunk(result["reply"])
+            response_text = result["reply"]
+
+            # Only plain FAQ answers are reusable (not tool results or error fallbacks)
+            if use_answer_cache and result["cacheable"] and not shared:
+                answer_cache.put(query_embedding, rag_context, response_text, rag_service.index_version)
         metrics.increment("messages_processed")
 
+        # 9. Add assistant response to history
+        session = await session_store.add_message(sid, "assistant", response_text) or session
+        llm_service.close_chat(chat, session, user_message, response_text)
+
+        return {
+            "reply": response_text,
+            "session_id": sid,
+            "user_type": session.get("user_type", "guest"),
+            "verified": session.get("verified", False),
+        }
+
+    @staticmethod
+    async def _produce_within(produce: Callable[[], Awaitable[tuple]], deadline: Deadline) -> tuple:
+        """
+        Await produce() until DEADLINE_HOLDING_MARGIN_SECONDS before the
+        deadline, then raise asyncio.TimeoutError so the holding answer goes
+        out in time. A committed request (a write tool has started) is awaited
+        to the end instead: the write runs in a thread and cannot be called
+        back, and a holding answer would invite a retry that books or cancels
+        twice.
+        """
+        task = asyncio.ensure_future(produce())
+        try:
+            timeout = max(0.0, deadline.remaining() - settings.DEADLINE_HOLDING_MARGIN_SECONDS)
+            await asyncio.wait({task}, timeout=timeout)
+            if not task.done():
+                if not deadline.committed:
+                    raise asyncio.TimeoutError
+                deadline.degrade("write_overrun")
+            return await task
+        finally:
+            task.cancel()  # no-op once finished
+
+    async def _generate_reply(
+        self,
+        user_message: str,
+        session: dict,
+        rag_context: list,
+        recent_history: list,
+        db: Session,
+        on_chunk: Optional[ChunkCallback],
+        chat: Optional[CachedChat],
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
+        """
+        LLM call, tool loop and response guardrails for one message.
+
+        Returns {"reply": str, "cacheable": bool} — cacheable is False for
+        tool-based answers and error fallbacks.
+        """
+        relay = _ChunkRelay(on_chunk, session.get("user_type", "guest")) if on_chunk else None
+        with metrics.timer("llm_latency_ms"), _stage(deadline, "llm"):
+            if relay:
+                llm_result = await self._stream_llm(
+                    relay, user_message, session, rag_context, recent_history, chat, deadline
+                )
+            else:
+                llm_result = await llm_service.generate_response(
+                    user_message=user_message,
+                    session=session,
+                    rag_context=rag_context,
+                    conversation_history=recent_history,
+                    chat=chat,
+                    deadline=deadline,
+                )
+        if llm_result.get("error") and deadline is not None and deadline.expired:
+            raise DeadlineExceeded("LLM did not answer within the request budget")
+
         # 7. Handle tool calls if any
         if llm_result["tool_calls"]:
-            metrics.increment("tool_calls_total", len(llm_result["tool_calls"]))
-            response_text = await self._handle_tool_calls(
-                llm_result["tool_calls"],
-                session,
-                db,
-                recent_history + [{"role": "user", "content": user_message}],
-            )
+            with _stage(deadline, "tools"):
+                response_text = await self._handle_tool_calls(
+                    llm_result["tool_calls"],
+                    session,
+                    db,
+                    recent_history + [{"role": "user", "content": user_message}],
+                    relay,
+                    chat,
+                    deadline,
+                )
         else:
             response_text = llm_result["response"]
 
+        if relay:
+            await relay.flush()
+
         # 8. Apply safety guardrails to response
         response_text = check_response_safety(
             response_text,
             session.get("user_type", "guest"),
         )
 
-        # 9. Add assistant response to history
-        session_store.add_message(sid, "assistant", response_text)
-
         return {
             "reply": response_text,
-            "session_id": sid,
-            "user_type": session.get("user_type", "guest"),
-            "verified": session.get("verified", False),
+            "cacheable": not llm_result["tool_calls"] and not llm_result.get("error"),
         }
 
+    def _needs_retrieval(self, user_message: str, session: dict) -> bool:
+        """Classify the message and record whether retrieval is skipped."""
+        if not settings.RAG_INTENT_GATING:
+            return True
+        intent = classify_intent(user_message, verified=bool(session.get("verified")))
+        metrics.increment(f"intent_{intent}")
+        retrieve = needs_retrieval(intent)
+        if retrieve:
+            self._retrievals += 1
+        else:
+            self._retrieval_skips += 1
+            metrics.increment("rag_skipped_by_intent")
+        metrics.set_gauge(
+            "rag_intent_skip_rate",
+            round(self._retrieval_skips / (self._retrievals + self._retrieval_skips), 3),
+        )
+        return retrieve
+
+    async def _timed_retrieve(self, *args) -> tuple:
+        """_retrieve, recorded in rag_latency_ms."""
+        with metrics.timer("rag_latency_ms"):
+            return await self._retrieve(*args)
+
+    async def _retrieve(
+        self,
+        user_message: str,
+        access_level: str,
+        embed: bool,
+        deadline: Optional[Deadline],
+    ) -> tuple:
+        """
+        Embed the query (if needed for the answer cache) and retrieve FAQ context.
+
+        Chroma queries and ONNX embedding are blocking, so both run in the
+        blocking executor. Under a deadline, RAG gets at most
+        DEADLINE_RAG_MAX_SECONDS and never eats into the LLM reserve; when that
+        leaves no time, or it runs over, the LLM answers without context.
+
+        Returns (query_embedding or None, rag_context).
+        """
+        async def run() -> tuple:
+            query_embedding = None
+            if embed:
+                query_embedding = await blocking_executor.run(rag_service.embed_query, user_message)
+            rag_context = await blocking_executor.run(
+                rag_service.retrieve,
+                user_message,
+                top_k=settings.RAG_MAX_CONTEXT_CHUNKS,
+                access_level=access_level,
+                query_embedding=query_embedding,
+            )
+            return query_embedding, rag_context
+
+        if deadline is None:
+            return await run()
+
+        timeout = min(
+            settings.DEADLINE_RAG_MAX_SECONDS,
+            deadline.remaining() - settings.DEADLINE_LLM_RESERVE_SECONDS,
+        )
+        if timeout <= 0:
+            deadline.degrade("rag_skipped")
+            return None, []
+        with deadline.stage("rag"):
+            try:
+                return await asyncio.wait_for(run(), timeout)
+            except asyncio.TimeoutError:
+                deadline.degrade("rag_timeout")
+                return None, []
+
+    @staticmethod
+    def _coalesce_key(user_message: str, access_level: str, rag_context: list, recent_history: list) -> tuple:
+        """Everything the reply depends on for a guest: message, access, context and history."""
+        normalized = " ".join(re.findall(r"\w+", user_message.lower()))
+        chunk_ids = tuple(sorted(ctx.get("id", ctx["source"]) for ctx in rag_context))
+        history = hash(tuple((msg["role"], msg["content"]) for msg in recent_history))
+        return normalized, access_level, chunk_ids, history
+
+    async def _stream_llm(
+        self,
+        relay: _ChunkRelay,
+        user_message: str,
+        session: dict,
+        rag_context: list,
+        conversation_history: list,
+        chat: Optional[CachedChat] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
+        """Run the first LLM call in streaming mode, relaying text as it arrives."""
+        start = time.time()
+        first_chunk = True
+        async for event in llm_service.generate_response_stream(
+            user_message=user_message,
+            session=session,
+            rag_context=rag_context,
+            conversation_history=conversation_history,
+            chat=chat,
+            deadline=deadline,
+        ):
+            if event.get("done"):
+                return event
+            if first_chunk:
+                metrics.observe("llm_first_token_ms", (time.time() - start) * 1000)
+                first_chunk = False
+            await relay.feed(event["text"])
+        return {"response": "", "tool_calls": []}
+
     async def _handle_tool_calls(
         self,
         tool_calls: list,
         session: dict,
         db: Session,
         conversation_history: list,
+        relay: Optional[_ChunkRelay] = None,
+        chat: Optional[CachedChat] = None,
+        deadline: Optional[Deadline] = None,
     ) -> str:
-        """Execute tool calls and get the final LLM response with results."""
-        all_results = []
+        """
+        Run the agentic tool loop: execute the requested tools, send all results
+        back to the LLM, and repeat while it asks for more — up to
+        TOOL_LOOP_MAX_STEPS hops within TOOL_LOOP_BUDGET_SECONDS (and, under a
+        request deadline, without eating into the final answer's reserve).
+        When a limit is hit, outstanding calls are answered as skipped and the
+        LLM must reply with the data gathered so far.
+        """
+        budget = settings.TOOL_LOOP_BUDGET_SECONDS
+        if deadline is not None:
+            budget = min(budget, deadline.remaining() - settings.DEADLINE_LLM_RESERVE_SECONDS)
+        loop_deadline = time.time() + budget
+        step = 0
+
+        while True:
+            writes = tool_router.has_writes(tool_calls)
+            if time.time() >= loop_deadline or (
+                deadline is not None and writes
+                and loop_deadline - time.time() < settings.DEADLINE_WRITE_TOOL_SECONDS
+            ):
+                # A write is only started with time to finish it and report the outcome
+                llm_result = await self._skip_tool_calls(
+                    tool_calls, step, conversation_history, relay, chat, deadline
+                )
+                break
 
-        for tc in tool_calls:
-            tool_name = tc["name"]
-            tool_args = tc["args"]
+            step += 1
+            # Counted here, not when requested: skipped calls never run
+            metrics.increment("tool_calls_total", len(tool_calls))
+            if deadline is not None and writes:
+                deadline.commit()
+            results = await tool_router.execute_batch(tool_calls, session, db)
 
-            logger.info(f"Executing tool: {tool_name} with args: {json.dumps(tool_args)}")
+            out_of_budget = step >= settings.TOOL_LOOP_MAX_STEPS or time.time() >= loop_deadline
+            llm_result = await self._tool_result_llm(
+                results, conversation_history, relay, chat,
+                allow_tools=not out_of_budget, deadline=deadline,
+            )
+
+            tool_calls = llm_result["tool_calls"]
+            if not tool_calls:
+                break
 
-            # Execute via tool router
-            with metrics.timer(f"tool_{tool_name}_ms"):
-                result = tool_router.execute(tool_name, tool_args, session, db)
-            all_results.append((tool_name, result))
+            if out_of_budget:
+                llm_result = await self._skip_tool_calls(
+                    tool_calls, step, conversation_history, relay, chat, deadline
+                )
+                break
 
-            logger.info(f"Tool result: {json.dumps(result, default=str)[:200]}...")
+        metrics.observe("tool_loop_steps", step)
+        return llm_result["response"]
 
-        # Send tool results back to LLM for natural language response
-        # Use the last tool call's result for the response
-        if all_results:
-            last_tool_name, last_result = all_results[-1]
-            response = await llm_service.generate_with_tool_result(
+    async def _skip_tool_calls(
+        self,
+        tool_calls: list,
+        step: int,
+        conversation_history: list,
+        relay: Optional[_ChunkRelay],
+        chat: Optional[CachedChat],
+        deadline: Optional[Deadline],
+    ) -> dict:
+        """The LLM wants another hop but the step or time budget is spent: answer the calls as skipped."""
+        logger.info(f"Tool loop budget exhausted after {step} step(s); answering with partial data")
+        metrics.increment("tool_loop_budget_exhausted")
+        if deadline is not None:
+            deadline.degrade("tools_skipped")
+        return await self._tool_result_llm(
+            [(tc["name"], _SKIPPED_TOOL_RESULT) for tc in tool_calls],
+            conversation_history, relay, chat, allow_tools=False, deadline=deadline,
+        )
+
+    async def _tool_result_llm(
+        self,
+        tool_results: list,
+        conversation_history: list,
+        relay: Optional[_ChunkRelay],
+        chat: Optional[CachedChat],
+        allow_tools: bool,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
+        """Send a batch of tool results to the LLM, streaming the reply if a relay is set."""
+        if not relay:
+            return await llm_service.generate_with_tool_result(
                 conversation_history=conversation_history,
-                tool_name=last_tool_name,
-                tool_result=last_result,
+                tool_results=tool_results,
+                chat=chat,
+                allow_tools=allow_tools,
+                deadline=deadline,
             )
-            return response
 
-        return "I tried to process your request but encountered an issue. Please try again."
+        async for event in llm_service.stream_with_tool_result(
+            conversation_history=conversation_history,
+            tool_results=tool_results,
+            chat=chat,
+            allow_tools=allow_tools,
+            deadline=deadline,
+        ):
+            if event.get("done"):
+                return event
+            await relay.feed(event["text"])
+        return {"response": "", "tool_calls": []}
+
+
+# Function response sent for calls not executed because the tool loop ran out of budget
+_SKIPPED_TOOL_RESULT = {
+    "error": True,
+    "skipped": True,
+    "message": "Not executed: the time budget for this request ran out. "
+               "Answer with the information gathered so far and offer to continue.",
+}
+
+
+# Reply used when a budgeted request runs out of time before the LLM answers
+_HOLDING_ANSWER = (
+    "I'm sorry, that is taking longer than expected. "
+    "Could you please ask me again in a moment?"
+)
+
+
+def _stage(deadline: Optional[Deadline], name: str):
+    """Budget accounting for a pipeline stage; a no-op without a deadline."""
+    return deadline.stage(name) if deadline is not None else nullcontext()
 
 
 # Global orchestrator instance
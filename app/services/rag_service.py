@@ -1,8 +1,63 @@
 import os
+import re
+import asyncio
+import time
+import hashlib
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from typing import List
-import chromadb
+from typing import Callable, Iterator, List, Optional, Tuple
 from app.config import settings
+from app.logger import logger
+from app.services.executors import blocking_executor
+from app.services.chunker import estimate_tokens
+from app.services.ingestion import ACCESS_LEVELS, SUPPORTED_EXTENSIONS, chunk_document
+from app.services.lexical_index import BM25Index, tokenize
+from app.services.metrics import metrics
+from app.services.vector_store import UnionVectorStore, create_vector_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process index lock, so run a single worker
+    fcntl = None
+
+
+@contextmanager
+def _index_write_lock():
+    """
+    Exclusive lock on the on-disk index, held by whichever process is writing
+    to it (an app worker's sync or ingest_docs.py). Chroma's local persistent
+    mode is not safe for concurrent writers, so only one process writes at a time.
+    """
+    if fcntl is None:
+        yield
+        return
+    Path(settings.CHROMA_PERSIST_DIR).mkdir(parents=True, exist_ok=True)
+    with open(Path(settings.CHROMA_PERSIST_DIR) / "sync.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _IndexSnapshot:
+    """
+    One complete version of the retrieval index; replaced as a whole on reload.
+
+    lexical and vectors map a search scope to its index: "public" covers public
+    chunks only (guests), "all" every access level (verified users).
+    """
+
+    __slots__ = ("version", "lexical", "vectors")
+
+    def __init__(self, version: int, lexical: dict, vectors: dict):
+        self.version = version
+        self.lexical = lexical
+        self.vectors = vectors
 
 
 class RAGService:
@@ -10,145 +65,519 @@ class RAGService:
 
     def __init__(self):
         self._client = None
-        self._collection = None
+        self._collections: dict = {}     # access level → Chroma collection
+        self._embedding_fn = None
         self._initialized = False
+        # Current index; retrieve() reads it once per query, sync() swaps it in one assignment
+        self._index: Optional[_IndexSnapshot] = None
+        # Document path → (content sha256, documents, metadatas, ids) as last indexed
+        self._file_chunks: dict[str, tuple] = {}
+        self._sync_lock = threading.Lock()
+        # Normalised query text → embedding, least recently used first
+        self._query_embeddings: OrderedDict[str, List[float]] = OrderedDict()
+        self._query_cache_size = settings.RAG_QUERY_CACHE_SIZE
+        self._query_cache_lock = threading.Lock()   # retrieve runs on several executor threads
 
-    def initialize(self):
-        """Load FAQ documents and build the vector index."""
+    @property
+    def index_version(self) -> int:
+        """
+        Bumped whenever the indexed content changes, so caches keyed on
+        retrieval results (e.g. the answer cache) know to drop their entries.
+        """
+        return self._index.version if self._index else 0
+
+    def initialize(self, progress: Optional[Callable[[dict], None]] = None, sync: bool = True):
+        """
+        Open the on-disk vector index and sync it with the FAQ files.
+
+        Chunk IDs are content hashes, so only new or changed chunks are
+        embedded and chunks that no longer exist are deleted; an unchanged
+        knowledge base starts without embedding anything. With sync=False only
+        the collections are opened, for callers that run sync(full=True) next.
+        """
         if self._initialized:
             return
 
         print("Initializing RAG service...")
+        start = time.time()
 
-        # Create persistent ChromaDB client
-        self._client = chromadb.Client(chromadb.Settings(
-            anonymized_telemetry=False,
-        ))
+        # Imported here: chromadb takes ~0.3 s to import and only the server needs it
+        import chromadb
+        from chromadb.utils import embedding_functions
 
-        # Create or get collection
-        self._collection = self._client.get_or_create_collection(
-            name="hospital_faqs",
-            metadata={"hnsw:space": "cosine"},
+        # Persistent ChromaDB client — survives restarts. Each process keeps its
+        # own in-memory HNSW segment, which does not see other processes' writes:
+        # with several workers use RAG_VECTOR_BACKEND=numpy, built from the stored
+        # embeddings on every sync. Writes go through _index_write_lock.
+        self._client = chromadb.PersistentClient(
+            path=settings.CHROMA_PERSIST_DIR,
+            settings=chromadb.Settings(anonymized_telemetry=False),
         )
 
-        # Check if already indexed
-        if self._collection.count() > 0:
-            print(f"RAG index already has {self._collection.count()} chunks. Skipping ingestion.")
-            self._initialized = True
-            return
+        # One collection per access level (embedding function kept so queries can be embedded once and reused)
+        self._embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        self._collections = {
+            level: self._client.get_or_create_collection(
+                name=f"hospital_faqs_{level}",
+                metadata={"hnsw:space": "cosine"},
+                embedding_function=self._embedding_fn,
+            )
+            for level in ACCESS_LEVELS
+        }
+        # Indexes from before the access-level split kept every chunk in one collection
+        if any(collection.name == "hospital_faqs" for collection in self._client.list_collections()):
+            with _index_write_lock():
+                self._client.delete_collection("hospital_faqs")
+
+        if sync:
+            self.sync(progress=progress)
+        metrics.set_gauge("rag_startup_ms", round((time.time() - start) * 1000, 1))
+        self._initialized = True
 
-        # Load and index FAQ documents
-        faq_dir = Path(settings.FAQ_DIR)
-        if not faq_dir.exists():
-            print(f"Warning: FAQ directory not found at {faq_dir}")
-            self._initialized = True
+    def warm_up(self) -> None:
+        """
+        Load the embedding model and run one vector query, so the first user
+        question does not pay for either.
+        """
+        if not self._initialized:
             return
+        start = time.time()
+        embedding = [float(x) for x in self._embedding_fn(["warm-up"])[0]]
+        if self._index is not None:
+            self._index.vectors["all"].query(embedding, 1)
+        metrics.set_gauge("rag_warmup_ms", round((time.time() - start) * 1000, 1))
+
+    def sync(self, full: bool = False, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Bring the index in line with the document files on disk.
+
+        Only files whose content changed are re-chunked, only new chunks are
+        embedded. full=True re-ingests everything: every file is re-chunked
+        and every chunk re-embedded (e.g. after swapping the embedding
+        model). Queries keep using the current index until the new one is
+        complete, then switch to it in a single assignment; chunks that are
+        gone are deleted from Chroma only after the switch.
+
+        Ingestion streams: many changed files are parsed and chunked in a
+        process pool, and new chunks are embedded and written to Chroma in
+        batches of RAG_EMBED_BATCH_SIZE as files finish, so a large import is
+        never held in memory unembedded. progress, if given, is called with
+        the running counters after every file and batch.
+
+        Runs under the on-disk index lock, so workers sharing CHROMA_PERSIST_DIR
+        sync one at a time; a worker that syncs after another finds the chunks
+        already embedded and only rebuilds its in-memory index.
+
+        Returns {"changed_files": [...], "embedded": int, "removed": int, "chunks": int, "version": int}
+        """
+        with self._sync_lock, _index_write_lock():
+            start = time.time()
+            if not Path(settings.FAQ_DIR).exists():
+                print(f"Warning: FAQ directory not found at {settings.FAQ_DIR}")
+
+            if full:
+                self._file_chunks = {}
+            existing = {}
+            for level in ACCESS_LEVELS:
+                stored = self._collections[level].get(include=["metadatas"])
+                existing[level] = dict(zip(stored["ids"], stored["metadatas"]))
+
+            # Stream chunked files into embedding batches
+            doc_files = self._document_files()
+            counters = {"files_total": len(doc_files), "files_done": 0, "chunks": 0, "embedded": 0}
+            file_chunks, changed_files = {}, []
+            pending: List[tuple] = []   # (level, chunk_id, document, metadata) awaiting embedding
+            queued = set()
+            for key, entry, changed in self._chunk_files(doc_files):
+                file_chunks[key] = entry
+                if changed:
+                    changed_files.append(Path(key).name)
+                _, file_documents, file_metadatas, file_ids = entry
+                for chunk_id, document, metadata in zip(file_ids, file_documents, file_metadatas):
+                    level = metadata["access_level"]
+                    if (full or chunk_id not in existing[level]) and chunk_id not in queued:
+                        queued.add(chunk_id)
+                        pending.append((level, chunk_id, document, metadata))
+                counters["files_done"] += 1
+                counters["chunks"] += len(file_ids)
+                while len(pending) >= settings.RAG_EMBED_BATCH_SIZE:
+                    batch, pending = pending[:settings.RAG_EMBED_BATCH_SIZE], pending[settings.RAG_EMBED_BATCH_SIZE:]
+                    counters["embedded"] += self._write_batch(batch)
+                self._report_progress(counters, start, progress)
+            if pending:
+                counters["embedded"] += self._write_batch(pending)
+                self._report_progress(counters, start, progress)
+            changed_files.extend(sorted(Path(key).name for key in set(self._file_chunks) - set(file_chunks)))
+
+            documents, metadatas, ids = [], [], []
+            for _, file_documents, file_metadatas, file_ids in file_chunks.values():
+                documents.extend(file_documents)
+                metadatas.extend(file_metadatas)
+                ids.extend(file_ids)
+            wanted = {level: {} for level in ACCESS_LEVELS}
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                wanted[metadata["access_level"]][chunk_id] = (document, metadata)
+            stale = {
+                level: [chunk_id for chunk_id in existing[level] if chunk_id not in wanted[level]]
+                for level in ACCESS_LEVELS
+            }
+            # Same text, new position (e.g. a section was added above it)
+            moved = {
+                level: [
+                    chunk_id for chunk_id, (_, metadata) in wanted[level].items()
+                    if not full and chunk_id in existing[level] and existing[level][chunk_id] != metadata
+                ]
+                for level in ACCESS_LEVELS
+            }
+            embedded = counters["embedded"]
+            removed = sum(len(stale_ids) for stale_ids in stale.values())
+
+            summary = {
+                "changed_files": changed_files,
+                "embedded": embedded,
+                "removed": removed,
+                "chunks": len(ids),
+                "version": self.index_version,
+            }
+            if self._index is not None and not (changed_files or embedded or removed or any(moved.values())):
+                return summary
+
+            for level, moved_ids in moved.items():
+                if moved_ids:
+                    # Metadata-only update — no re-embedding
+                    self._collections[level].update(
+                        ids=moved_ids, metadatas=[wanted[level][chunk_id][1] for chunk_id in moved_ids]
+                    )
+
+            # Build the new index alongside the live one, then swap
+            partitions = {
+                level: create_vector_store(settings.RAG_VECTOR_BACKEND, self._collections[level], list(wanted[level]))
+                for level in ACCESS_LEVELS
+            }
+            public_lexical = BM25Index()
+            public_lexical.build(
+                list(wanted["public"]),
+                [document for document, _ in wanted["public"].values()],
+                [metadata for _, metadata in wanted["public"].values()],
+            )
+            all_lexical = BM25Index()
+            all_lexical.build(ids, documents, metadatas)
+            self._index = _IndexSnapshot(
+                self.index_version + 1,
+                lexical={"public": public_lexical, "all": all_lexical},
+                vectors={"public": partitions["public"], "all": UnionVectorStore(partitions.values())},
+            )
+            self._file_chunks = file_chunks
+
+            for level, stale_ids in stale.items():
+                if stale_ids:
+                    self._collections[level].delete(ids=stale_ids)
 
-        documents = []
-        metadatas = []
-        ids = []
-        chunk_id = 0
+            summary["version"] = self.index_version
+            elapsed_ms = (time.time() - start) * 1000
+            metrics.set_gauge("rag_chunks_total", len(ids))
+            for level in ACCESS_LEVELS:
+                metrics.set_gauge(f"rag_chunks_{level}", len(wanted[level]))
+            metrics.set_gauge("rag_chunks_embedded", embedded)
+            metrics.set_gauge("rag_chunks_deleted", removed)
+            metrics.observe("rag_sync_ms", elapsed_ms)
+            partition_sizes = ", ".join(f"{len(wanted[level])} {level}" for level in ACCESS_LEVELS)
+            print(
+                f"RAG index v{self.index_version} synced in {elapsed_ms:.0f} ms: {len(ids)} chunks ({partition_sizes}; "
+                f"{embedded} embedded, {len(ids) - embedded} reused, {removed} removed), "
+                f"{partitions['public'].name} vector backend."
+            )
+            return summary
 
-        for faq_file in sorted(faq_dir.glob("*.md")):
-            content = faq_file.read_text(encoding="utf-8")
-            source = faq_file.stem.replace("_", " ").title()
+    def _write_batch(self, batch: List[tuple]) -> int:
+        """Embed one batch of (level, chunk_id, document, metadata) and upsert it into each level's collection."""
+        with metrics.timer("rag_ingest_embed_ms"):
+            embeddings = self._embedding_fn([document for _, _, document, _ in batch])
+        by_level = defaultdict(list)
+        for item, embedding in zip(batch, embeddings):
+            by_level[item[0]].append((item, embedding))
+        for level, items in by_level.items():
+            self._collections[level].upsert(
+                ids=[chunk_id for (_, chunk_id, _, _), _ in items],
+                documents=[document for (_, _, document, _), _ in items],
+                metadatas=[metadata for (_, _, _, metadata), _ in items],
+                embeddings=[[float(x) for x in embedding] for _, embedding in items],
+            )
+        return len(batch)
 
-            # Split by sections (## headers)
-            chunks = self._split_into_chunks(content)
+    @staticmethod
+    def _report_progress(counters: dict, start: float, progress: Optional[Callable[[dict], None]]) -> None:
+        elapsed = max(time.time() - start, 1e-6)
+        metrics.set_gauge("rag_ingest_files_total", counters["files_total"])
+        metrics.set_gauge("rag_ingest_files_done", counters["files_done"])
+        metrics.set_gauge("rag_ingest_chunks_embedded", counters["embedded"])
+        metrics.set_gauge("rag_ingest_files_per_second", round(counters["files_done"] / elapsed, 1))
+        metrics.set_gauge("rag_ingest_chunks_per_second", round(counters["embedded"] / elapsed, 1))
+        if progress:
+            progress({**counters, "elapsed_s": round(elapsed, 2)})
 
-            for chunk in chunks:
-                if len(chunk.strip()) < 30:  # skip tiny chunks
+    async def watch(self, interval_seconds: float) -> None:
+        """
+        Poll the document directories and sync whenever a file is added,
+        changed or removed. Runs until cancelled (started from the app lifespan).
+        Directory scans run in the blocking executor, like sync(): with thousands
+        of documents, walking and stat-ing them would stall the event loop.
+        """
+        last_seen = await blocking_executor.run(self._faq_signature)
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                signature = await blocking_executor.run(self._faq_signature)
+                if signature == last_seen:
                     continue
-                documents.append(chunk.strip())
-                metadatas.append({
-                    "source": source,
-                    "file": faq_file.name,
-                    "access_level": "public",  # all FAQs are public
-                })
-                ids.append(f"chunk_{chunk_id}")
-                chunk_id += 1
-
-        if documents:
-            # Add to ChromaDB in batches
-            batch_size = 50
-            for i in range(0, len(documents), batch_size):
-                self._collection.add(
-                    documents=documents[i:i + batch_size],
-                    metadatas=metadatas[i:i + batch_size],
-                    ids=ids[i:i + batch_size],
+                summary = await blocking_executor.run(self.sync)
+                # Only after a successful sync: a failed one is retried next interval
+                last_seen = signature
+                if summary["changed_files"]:
+                    metrics.increment("rag_hot_reloads")
+                    print(f"FAQ hot-reload: {', '.join(summary['changed_files'])}")
+            except Exception as e:
+                print(f"FAQ hot-reload failed: {e}")
+
+    @staticmethod
+    def _document_files() -> List[Tuple[Path, str]]:
+        """
+        Every document to index (Markdown, HTML or plain text, subfolders
+        included), with the access level it gets unless the document says
+        otherwise: FAQ_DIR files are public, PRIVATE_DOCS_DIR files (optional)
+        are for registered users.
+        """
+        files = []
+        for directory, default_level in ((settings.FAQ_DIR, "public"), (settings.PRIVATE_DOCS_DIR, "registered")):
+            path = Path(directory)
+            if path.exists():
+                files.extend(
+                    (doc_file, default_level)
+                    for doc_file in sorted(path.rglob("*"))
+                    if doc_file.suffix.lower() in SUPPORTED_EXTENSIONS and doc_file.is_file()
                 )
+        return files
 
-            print(f"Indexed {len(documents)} chunks from {len(list(faq_dir.glob('*.md')))} FAQ files.")
-        else:
-            print("No FAQ documents found to index.")
+    @classmethod
+    def _faq_signature(cls) -> tuple:
+        """Cheap change detector: (path, mtime, size) of every document file."""
+        return tuple(
+            (str(path), stat.st_mtime_ns, stat.st_size)
+            for path, _ in cls._document_files()
+            for stat in [path.stat()]
+        )
 
-        self._initialized = True
+    def _chunk_files(self, doc_files: List[Tuple[Path, str]]) -> Iterator[Tuple[str, tuple, bool]]:
+        """
+        Chunk the document files, reusing the previous chunks of unchanged files.
 
-    def _split_into_chunks(self, content: str) -> List[str]:
-        """Split markdown content into meaningful chunks by sections."""
-        chunks = []
-        current_chunk_lines = []
+        Yields (file path, (sha256, documents, metadatas, ids), changed) per
+        file: unchanged files first, then changed ones as they finish. With at
+        least RAG_INGEST_PARALLEL_MIN_FILES changed files, parsing and chunking
+        run in a process pool of RAG_INGEST_WORKERS (0 = one per CPU).
+        """
+        to_chunk = []
+        for doc_file, default_level in doc_files:
+            key = str(doc_file)
+            raw = doc_file.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            previous = self._file_chunks.get(key)
+            if previous and previous[0] == digest:
+                yield key, previous, False
+                continue
+            to_chunk.append((key, raw, digest, default_level))
 
-        for line in content.split("\n"):
-            # Split on ## headers (section boundaries)
-            if line.startswith("## ") and current_chunk_lines:
-                chunks.append("\n".join(current_chunk_lines))
-                current_chunk_lines = [line]
-            else:
-                current_chunk_lines.append(line)
+        chunk_args = (settings.RAG_CHUNK_MAX_TOKENS, settings.RAG_CHUNK_OVERLAP_TOKENS)
+        workers = settings.RAG_INGEST_WORKERS or os.cpu_count() or 1
+        if workers > 1 and len(to_chunk) >= settings.RAG_INGEST_PARALLEL_MIN_FILES:
+            # spawn, not fork: sync runs on an executor thread of a multi-threaded server
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {
+                    pool.submit(chunk_document, key, raw, default_level, *chunk_args): (key, digest)
+                    for key, raw, digest, default_level in to_chunk
+                }
+                for future in as_completed(futures):
+                    key, digest = futures[future]
+                    yield key, (digest, *future.result()), True
+            return
+
+        for key, raw, digest, default_level in to_chunk:
+            yield key, (digest, *chunk_document(key, raw, default_level, *chunk_args)), True
+
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """
+        Embed a query with the index's embedding function (None if not ready).
+        Embeddings are cached by normalised query text, so repeated questions
+        skip the ONNX model.
+        """
+        if not self._initialized or not self._embedding_fn:
+            return None
+
+        key = self._normalize_query(query)
+        with self._query_cache_lock:
+            embedding = self._query_embeddings.get(key)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(key)
+        if embedding is not None:
+            metrics.increment("rag_query_embedding_hits")
+            return embedding
 
-        # Don't forget the last chunk
-        if current_chunk_lines:
-            chunks.append("\n".join(current_chunk_lines))
+        metrics.increment("rag_query_embedding_misses")
+        with metrics.timer("rag_embedding_ms"):
+            embedding = [float(x) for x in self._embedding_fn([query])[0]]
+        with self._query_cache_lock:
+            self._query_embeddings[key] = embedding
+            self._query_embeddings.move_to_end(key)
+            while len(self._query_embeddings) > self._query_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
 
-        return chunks
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Case- and punctuation-insensitive cache key: "Visiting hours?" == "visiting hours"."""
+        return " ".join(re.findall(r"\w+", query.lower()))
 
-    def retrieve(self, query: str, top_k: int = 4, access_level: str = "public") -> List[dict]:
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 4,
+        access_level: str = "public",
+        query_embedding: Optional[List[float]] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[dict]:
         """
         Retrieve the most relevant FAQ chunks for a query.
+
+        Guests search the public partition only; verified users search every
+        access level's partition at once. Hybrid retrieval: BM25 and vector
+        rankings are fused with reciprocal rank fusion. When the lexical match
+        is decisive for a short query, the BM25 results are returned directly
+        and no embedding is computed.
+        The ranking is then trimmed to what is worth putting in a prompt
+        (see _select_context), so fewer than top_k chunks — or none — may return.
         
         Args:
             query: User's question
-            top_k: Number of results to return
+            top_k: Maximum number of results to return
             access_level: "public" for guests, "all" for registered users
+            query_embedding: Precomputed embedding of query (skips re-embedding)
+            max_tokens: Context token budget (default RAG_CONTEXT_MAX_TOKENS)
         
-        Returns list of {"content": str, "source": str, "score": float}
+        Returns list of {"id": str, "content": str, "source": str, "file": str,
+        "score": float, "retrieval": "hybrid" | "lexical"}
         """
-        if not self._initialized or not self._collection:
+        index = self._index  # one consistent snapshot for the whole query, even mid-reload
+        if not self._initialized or index is None:
             return []
-
-        if self._collection.count() == 0:
+        scope = "public" if access_level == "public" else "all"
+        lexical_index, vectors = index.lexical[scope], index.vectors[scope]
+        if len(vectors) == 0:
             return []
 
-        # Build query kwargs
-        query_kwargs = {
-            "query_texts": [query],
-            "n_results": min(top_k, self._collection.count()),
-        }
+        candidates = max(top_k, settings.RAG_HYBRID_CANDIDATES)
+        with metrics.timer("rag_bm25_ms"):
+            lexical = lexical_index.search(query, top_k=candidates)
+
+        # Lexical fast path — skips embedding and the vector query entirely
+        if self._lexical_is_decisive(query, lexical):
+            metrics.increment("rag_lexical_fast_path")
+            best = lexical[0][1]
+            return self._select_context([
+                self._result(chunk_id, *lexical_index.document(chunk_id), score / best, "lexical")
+                for chunk_id, score in lexical[:top_k]
+            ], max_tokens)
+        metrics.increment("rag_hybrid_queries")
+
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        with metrics.timer("rag_vector_ms"):
+            hits = vectors.query(query_embedding, candidates)
+        dense = {chunk_id: (doc, metadata, score) for chunk_id, doc, metadata, score in hits}
+
+        # Reciprocal rank fusion of the two rankings
+        fused = defaultdict(float)
+        for rank, chunk_id in enumerate(dense):
+            fused[chunk_id] += 1 / (settings.RAG_RRF_K + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical):
+            fused[chunk_id] += 1 / (settings.RAG_RRF_K + rank + 1)
+        top_ids = sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+        # Chunks found only lexically still get a cosine score, so scores stay comparable
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in dense]
+        if missing:
+            for chunk_id, score in vectors.similarity(missing, query_embedding).items():
+                doc, metadata = lexical_index.document(chunk_id)
+                dense[chunk_id] = (doc, metadata, score)
+
+        # The best BM25 hit is kept on a strong exact-term match, whatever its cosine score
+        keep = frozenset([lexical[0][0]]) if lexical and lexical[0][1] >= settings.RAG_LEXICAL_MIN_SCORE else frozenset()
+        return self._select_context([
+            self._result(chunk_id, *dense[chunk_id], "hybrid")
+            for chunk_id in top_ids
+            if chunk_id in dense
+        ], max_tokens, keep)
+
+    @staticmethod
+    def _select_context(results: List[dict], max_tokens: Optional[int] = None, keep: frozenset = frozenset()) -> List[dict]:
+        """
+        Keep only the chunks worth their prompt tokens, in ranking order.
 
-        # Filter by access level for guest users
-        if access_level == "public":
-            query_kwargs["where"] = {"access_level": "public"}
-
-        results = self._collection.query(**query_kwargs)
-
-        retrieved = []
-        if results and results["documents"]:
-            for doc, metadata, distance in zip(
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0],
-            ):
-                # ChromaDB returns distance; lower = more similar for cosine
-                relevance_score = max(0, 1 - distance)
-                retrieved.append({
-                    "content": doc,
-                    "source": metadata.get("source", "Unknown"),
-                    "file": metadata.get("file", ""),
-                    "score": round(relevance_score, 3),
-                })
-
-        return retrieved
+        1. Score threshold: drop chunks below RAG_MIN_SCORE.
+        2. Elbow: cut at the largest drop in the sorted scores, if that drop
+           is at least RAG_ELBOW_MIN_GAP — past a clear elbow the rest is noise.
+        3. Token budget: add chunks in order, skipping any that would overflow max_tokens.
+
+        Chunk IDs in `keep` (strong exact-term matches) skip steps 1 and 2.
+        """
+        if max_tokens is None:
+            max_tokens = settings.RAG_CONTEXT_MAX_TOKENS
+
+        ranked = [result for result in results if result["score"] >= settings.RAG_MIN_SCORE or result["id"] in keep]
+        scores = sorted((result["score"] for result in ranked), reverse=True)
+        if len(scores) > 1:
+            gaps = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+            elbow = max(range(len(gaps)), key=gaps.__getitem__)
+            if gaps[elbow] >= settings.RAG_ELBOW_MIN_GAP:
+                cutoff = scores[elbow]
+                ranked = [result for result in ranked if result["score"] >= cutoff or result["id"] in keep]
+
+        selected, tokens = [], 0
+        for result in ranked:
+            chunk_tokens = estimate_tokens(result["content"])
+            if tokens + chunk_tokens > max_tokens:
+                continue  # a shorter, lower-ranked chunk may still fit
+            selected.append(result)
+            tokens += chunk_tokens
+
+        metrics.observe("rag_context_chunks", len(selected))
+        metrics.observe("rag_context_tokens", tokens)
+        if len(selected) < len(results):
+            metrics.increment("rag_context_trimmed")
+        logger.info(f"RAG context: {len(selected)}/{len(results)} chunk(s), ~{tokens} tokens")
+        return selected
+
+    @staticmethod
+    def _lexical_is_decisive(query: str, lexical: List[Tuple[str, float]]) -> bool:
+        """A short keyword query whose best BM25 hit clearly beats the runner-up."""
+        if not settings.RAG_LEXICAL_FAST_PATH or not lexical:
+            return False
+        if len(tokenize(query)) > settings.RAG_LEXICAL_MAX_TERMS:
+            return False
+        best = lexical[0][1]
+        runner_up = lexical[1][1] if len(lexical) > 1 else 0.0
+        return best >= settings.RAG_LEXICAL_MIN_SCORE and best >= settings.RAG_LEXICAL_MARGIN * runner_up
+
+    @staticmethod
+    def _result(chunk_id: str, doc: str, metadata: dict, score: float, retrieval: str) -> dict:
+        return {
+            "id": chunk_id,
+            "content": doc,
+            "source": metadata.get("source", "Unknown"),
+            "file": metadata.get("file", ""),
+            "score": round(float(score), 3),
+            "retrieval": retrieval,
+        }
 
 
 # Global RAG service instance
@@ -0,0 +1,204 @@
+"""
+LLM rate governor — keeps Gemini traffic inside our RPM/TPM quota and fails
+fast when the API is unhealthy.
+
+- Two token buckets (requests per minute, tokens per minute) shared by every
+  LLM call in this process. Callers queue FIFO for capacity, up to a timeout.
+- A circuit breaker that opens after repeated rate-limit / server failures,
+  rejects calls immediately while open, and lets a single probe through once
+  the reset timeout has passed.
+- Jittered exponential backoff for retries.
+
+Quotas are per process: with several uvicorn workers, divide the account
+quota between them (GEMINI_RPM / GEMINI_TPM).
+"""
+import asyncio
+import random
+import time
+from typing import Optional, Tuple
+from app.config import settings
+from app.services.metrics import metrics
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call is refused locally (breaker open or quota queue timeout)."""
+
+
+class TokenBucket:
+    """
+    Continuously refilling token bucket.
+
+    Args:
+        capacity: Maximum tokens held (burst size)
+        refill_per_second: Tokens added per second
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        missing = amount - self._tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self._tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Credit (positive) or debit (negative) tokens after the fact; may go into debt."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive failures.
+    Open → half-open after `reset_seconds`; one probe call decides whether to
+    close again or re-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may proceed right now."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def release(self) -> None:
+        """Give back an admitted call that never reached the API (e.g. queue timeout)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                metrics.increment("llm_breaker_opened")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class LLMRateGovernor:
+    """Process-wide admission control for LLM calls."""
+
+    def __init__(self, rpm: int, tpm: int, queue_timeout: float, breaker: CircuitBreaker):
+        self.requests = TokenBucket(capacity=rpm, refill_per_second=rpm / 60.0)
+        self.tokens = TokenBucket(capacity=tpm, refill_per_second=tpm / 60.0)
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self._lock = asyncio.Lock()   # FIFO: waiters are admitted in arrival order
+        self._waiting = 0
+
+    async def acquire(self, est_tokens: int, timeout: Optional[float] = None) -> None:
+        """
+        Wait for one request slot and `est_tokens` of token quota.
+        Raises LLMUnavailableError if the breaker is open or the wait would
+        exceed the queue timeout (or `timeout`, if shorter).
+        """
+        if not self.breaker.allow():
+            metrics.increment("llm_breaker_rejections")
+            raise LLMUnavailableError("LLM circuit breaker is open")
+
+        est_tokens = min(est_tokens, self.tokens.capacity)
+        queue_timeout = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        deadline = time.monotonic() + queue_timeout
+        self._waiting += 1
+        self._publish()
+        try:
+            async with self._lock:
+                while True:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(est_tokens))
+                    if wait == 0:
+                        self.requests.take(1)
+                        self.tokens.take(est_tokens)
+                        return
+                    if time.monotonic() + wait > deadline:
+                        self.breaker.release()
+                        metrics.increment("llm_governor_timeouts")
+                        raise LLMUnavailableError("LLM quota queue timeout")
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+            self._publish()
+
+    def reconcile(self, est_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a call is known."""
+        if actual_tokens:
+            self.tokens.adjust(est_tokens - actual_tokens)
+
+    @staticmethod
+    def backoff_delay(attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+        ceiling = min(settings.LLM_RETRY_MAX_DELAY_SECONDS, settings.LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_queue_depth", self._waiting)
+
+    def status(self) -> dict:
+        """Current governor state for the /metrics endpoint."""
+        return {
+            "queue_depth": self._waiting,
+            "breaker_state": self.breaker.state,
+            "requests_available": round(self.requests.available, 1),
+            "tokens_available": round(self.tokens.available),
+        }
+
+
+def is_retryable_error(error: Exception, retryable_errors: Tuple[type, ...] = ()) -> bool:
+    """
+    Rate-limit, quota and transient server errors are worth retrying. Matched
+    by type, never by message: retryable_errors are the backend's own (see
+    LLMBackend.retryable_errors); timeouts are retryable for every backend.
+    """
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError) + tuple(retryable_errors))
+
+
+# Global rate governor instance
+llm_governor = LLMRateGovernor(
+    rpm=settings.GEMINI_RPM,
+    tpm=settings.GEMINI_TPM,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+    ),
+)
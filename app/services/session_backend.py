@@ -0,0 +1,338 @@
+"""
+Session backends — where chat sessions, voice calls and pending OTPs live.
+
+- MemorySessionBackend: a dict in this process. Fastest, but every uvicorn
+  worker has its own, so it only works with a single worker.
+- SQLiteSessionBackend: one SQLite file in WAL mode shared by every worker
+  process on the host. Readers never block, writes are short transactions.
+
+Selected with SESSION_BACKEND ("memory" or "sqlite"). Records are grouped by
+namespace ("chat", "voice", "otp"), each with its own time-to-live: an expired
+record is never returned, whether or not it has been purged yet. Records are
+JSON-able dicts, or objects whose namespace registers a codec (see
+register_codec). The memory backend hands out the stored objects themselves,
+SQLite decoded copies; either way, change records only through update().
+
+SQLite calls can wait up to 5 s on another worker's write lock, so async code
+reaches the backends through call_backend, which runs them in
+blocking_executor (in-memory calls stay inline).
+
+Both backends index records by expiry time, so purging costs O(log n) per
+expired record rather than a scan of every session. sweep_expired purges on a
+timer (started from the app lifespan) and publishes session metrics.
+"""
+import asyncio
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.services.executors import blocking_executor
+from app.services.metrics import metrics
+
+# Changes a record in place; called inside the backend's lock or transaction
+Mutator = Callable[[Any], None]
+
+
+class MemorySessionBackend:
+    """Process-local records (single worker only)."""
+
+    name = "memory"
+    blocking = False   # never waits on I/O: call_backend runs it inline
+
+    def __init__(self):
+        self._records: dict[str, dict[str, tuple]] = {}   # namespace → key → (expires_at, value)
+        # namespace → min-heap of (expires_at, key). Refreshing a TTL pushes a
+        # new entry; the old one is skipped when it surfaces.
+        self._expiry: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def register_codec(self, namespace: str, encode: Callable[[Any], dict], decode: Callable[[dict], Any]) -> None:
+        """Records are kept as the objects themselves; nothing to encode."""
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        """The record, or None if missing or expired."""
+        entry = self._records.get(namespace, {}).get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def set(self, namespace: str, key: str, value: dict, ttl_seconds: float) -> None:
+        """Store (or replace) a record that expires in ttl_seconds."""
+        with self._lock:
+            expires_at = time.time() + ttl_seconds
+            self._records.setdefault(namespace, {})[key] = (expires_at, value)
+            self._schedule(namespace, key, expires_at)
+
+    def update(self, namespace: str, key: str, mutate: Mutator, ttl_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Atomically apply mutate to the record, in place. Restarts the TTL if
+        ttl_seconds is given. Returns the record, or None if it is missing or
+        expired (mutate is not called).
+        """
+        with self._lock:
+            records = self._records.get(namespace, {})
+            entry = records.get(key)
+            now = time.time()
+            if entry is None or entry[0] <= now:
+                return None
+            value = entry[1]
+            mutate(value)
+            expires_at = now + ttl_seconds if ttl_seconds is not None else entry[0]
+            records[key] = (expires_at, value)
+            if expires_at != entry[0]:
+                self._schedule(namespace, key, expires_at)
+            return value
+
+    def pop(self, namespace: str, key: str) -> Optional[dict]:
+        """Atomically remove a record and return it (None if missing or expired)."""
+        with self._lock:
+            entry = self._records.get(namespace, {}).pop(key, None)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def purge_expired(self, namespace: str) -> int:
+        """Delete the namespace's expired records; returns how many."""
+        with self._lock:
+            records = self._records.get(namespace, {})
+            heap = self._expiry.get(namespace, [])
+            now = time.time()
+            purged = 0
+            while heap and heap[0][0] <= now:
+                expires_at, key = heapq.heappop(heap)
+                entry = records.get(key)
+                # Skip entries superseded by a later TTL, or for records already removed
+                if entry is not None and entry[0] == expires_at:
+                    del records[key]
+                    purged += 1
+        return purged
+
+    def purge_all_expired(self) -> dict:
+        """Delete expired records in every namespace; returns {namespace: count}."""
+        return {namespace: self.purge_expired(namespace) for namespace in list(self._records)}
+
+    def count(self, namespace: str) -> int:
+        """Records in the namespace, including expired ones not yet purged."""
+        return len(self._records.get(namespace, {}))
+
+    def counts(self) -> dict:
+        """{namespace: records}, including expired ones not yet purged."""
+        return {namespace: len(records) for namespace, records in list(self._records.items())}
+
+    def _schedule(self, namespace: str, key: str, expires_at: float) -> None:
+        """Index a record's expiry (caller holds the lock)."""
+        heap = self._expiry.setdefault(namespace, [])
+        heapq.heappush(heap, (expires_at, key))
+        if len(heap) > 2 * len(self._records[namespace]) + 64:
+            # Mostly superseded entries (e.g. sessions touched on every message): rebuild, O(n) once per n pushes
+            heap[:] = [(when, record_key) for record_key, (when, _) in self._records[namespace].items()]
+            heapq.heapify(heap)
+
+
+class SQLiteSessionBackend:
+    """
+    Records in a SQLite file shared by all worker processes on one host.
+
+    Args:
+        path: Database file (created if missing). Must be on a local disk:
+              WAL mode does not work over network file systems.
+    """
+
+    name = "sqlite"
+    blocking = True    # may wait on the write lock: call_backend runs it in blocking_executor
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_records (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS session_records_expires_at ON session_records (expires_at);
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()   # sqlite3 connections are per thread
+        self._codecs: dict[str, tuple] = {}   # namespace → (encode, decode)
+
+    def register_codec(self, namespace: str, encode: Callable[[Any], dict], decode: Callable[[dict], Any]) -> None:
+        """Store the namespace's records as json(encode(record)); decode the dict on the way out."""
+        self._codecs[namespace] = (encode, decode)
+
+    def _dumps(self, namespace: str, value) -> str:
+        codec = self._codecs.get(namespace)
+        return json.dumps(codec[0](value) if codec else value)
+
+    def _loads(self, namespace: str, text: str):
+        codec = self._codecs.get(namespace)
+        return codec[1](json.loads(text)) if codec else json.loads(text)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement updates open their own transaction
+            conn = sqlite3.connect(self._path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")   # durable enough for sessions, no fsync per write
+            conn.executescript(self._SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        """The record, or None if missing or expired."""
+        row = self._connection().execute(
+            "SELECT value FROM session_records WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return self._loads(namespace, row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: dict, ttl_seconds: float) -> None:
+        """Store (or replace) a record that expires in ttl_seconds."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO session_records (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, self._dumps(namespace, value), time.time() + ttl_seconds),
+        )
+
+    def update(self, namespace: str, key: str, mutate: Mutator, ttl_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Atomically apply mutate to the record and store it. Restarts the TTL
+        if ttl_seconds is given. Returns the new record, or None if it is
+        missing or expired (mutate is not called).
+        """
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front, so no other worker can
+        # change the record between the read and the write
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at FROM session_records WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            value = self._loads(namespace, row[0])
+            mutate(value)
+            conn.execute(
+                "UPDATE session_records SET value = ?, expires_at = ? WHERE namespace = ? AND key = ?",
+                (self._dumps(namespace, value), now + ttl_seconds if ttl_seconds is not None else row[1], namespace, key),
+            )
+            conn.execute("COMMIT")
+            return value
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pop(self, namespace: str, key: str) -> Optional[dict]:
+        """Atomically remove a record and return it (None if missing or expired)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM session_records WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM session_records WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None or row[1] <= time.time():
+            return None
+        return self._loads(namespace, row[0])
+
+    def purge_expired(self, namespace: str) -> int:
+        """Delete the namespace's expired records; returns how many."""
+        cursor = self._connection().execute(
+            "DELETE FROM session_records WHERE namespace = ? AND expires_at <= ?", (namespace, time.time())
+        )
+        return cursor.rowcount
+
+    def purge_all_expired(self) -> dict:
+        """Delete expired records in every namespace; returns {namespace: count}."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            # Both statements walk the expires_at index over the expired rows only
+            expired = dict(conn.execute(
+                "SELECT namespace, COUNT(*) FROM session_records WHERE expires_at <= ? GROUP BY namespace", (now,)
+            ).fetchall())
+            if expired:
+                conn.execute("DELETE FROM session_records WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return expired
+
+    def count(self, namespace: str) -> int:
+        """Records in the namespace, including expired ones not yet purged."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM session_records WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+    def counts(self) -> dict:
+        """{namespace: records}, including expired ones not yet purged."""
+        return dict(self._connection().execute(
+            "SELECT namespace, COUNT(*) FROM session_records GROUP BY namespace"
+        ).fetchall())
+
+
+def create_session_backend(name: str, path: str = ""):
+    """Instantiate the session backend selected by name ("memory" or "sqlite")."""
+    if name == "memory":
+        return MemorySessionBackend()
+    if name == "sqlite":
+        return SQLiteSessionBackend(path)
+    raise ValueError(f"Unknown session backend: {name!r} (expected 'memory' or 'sqlite')")
+
+
+async def call_backend(backend, method: str, *args, **kwargs):
+    """Await backend.method(*args, **kwargs) without blocking the event loop."""
+    fn = getattr(backend, method)
+    if backend.blocking:
+        return await blocking_executor.run(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+async def sweep_expired(backend, interval_seconds: float) -> None:
+    """
+    Purge expired sessions, voice calls and OTPs every interval_seconds and
+    publish sessions_live_<namespace>, sessions_expired_per_minute and
+    session_sweep_ms. Runs until cancelled (started from the app lifespan).
+    """
+    seen = set()
+    last_sweep = time.monotonic()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            start = time.perf_counter()
+            expired = await blocking_executor.run(backend.purge_all_expired)
+            live = await blocking_executor.run(backend.counts)
+            metrics.observe("session_sweep_ms", (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            print(f"Session sweep failed: {e}")
+            continue
+
+        now = time.monotonic()
+        metrics.set_gauge("sessions_expired_per_minute", round(sum(expired.values()) * 60 / (now - last_sweep), 1))
+        last_sweep = now
+        seen.update(live)
+        for namespace in seen:
+            metrics.set_gauge(f"sessions_live_{namespace}", live.get(namespace, 0))
+        for namespace, count in expired.items():
+            if count:
+                metrics.increment(f"sessions_expired_{namespace}", count)
+
+
+# Global session backend, shared by the chat session, voice call and OTP stores
+session_backend = create_session_backend(settings.SESSION_BACKEND, settings.SESSION_DB_PATH)
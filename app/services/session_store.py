@@ -1,116 +1,232 @@
+import sys
 import time
 import uuid
-from typing import Optional
+from typing import List, Optional
+
+from app.config import settings
+from app.services.session_backend import MemorySessionBackend, call_backend, session_backend
+
+# Conversation history kept per session (the last 20 turns)
+HISTORY_MESSAGES = 40
+
+
+class SessionRecord:
+    """
+    One chat session. Slotted (no per-instance __dict__) because tens of
+    thousands of mostly idle sessions are held at once.
+
+    History is a ring buffer of (role, content, timestamp) tuples: it grows
+    to HISTORY_MESSAGES, then each new message overwrites the oldest, so
+    adding a message never copies the history. Role strings are interned.
+
+    Reads like the session dict it replaces (session["verified"],
+    session.get("patient_name")); conversation_history is built on access,
+    so per-turn code uses history_len and history_window(n) instead.
+    """
+
+    _FIELDS = (
+        "session_id",
+        "user_type",        # "guest" or "registered"
+        "verified",
+        "patient_id",
+        "patient_name",
+        "patient_code",
+        "phone",
+        "message_count",    # total messages ever added (not reduced by trimming)
+        "history_epoch",    # bumped when cached LLM chats must be rebuilt
+        "created_at",
+        "last_active",
+    )
+    __slots__ = _FIELDS + ("_history", "_history_start")
+    _FIELD_SET = frozenset(_FIELDS)
+
+    def __init__(self, session_id: str, created_at: Optional[float] = None):
+        now = time.time()
+        self.session_id = session_id
+        self.user_type = "guest"
+        self.verified = False
+        self.patient_id = None
+        self.patient_name = None
+        self.patient_code = None
+        self.phone = None
+        self.message_count = 0
+        self.history_epoch = 0
+        self.created_at = created_at or now
+        self.last_active = now
+        self._history: list = []     # ring buffer, at most HISTORY_MESSAGES
+        self._history_start = 0      # index of the oldest message once the buffer is full
+
+    def add_message(self, role: str, content: str, timestamp: float) -> None:
+        """Append a message, overwriting the oldest once HISTORY_MESSAGES are held."""
+        message = (sys.intern(role), content, timestamp)
+        if len(self._history) < HISTORY_MESSAGES:
+            self._history.append(message)
+        else:
+            self._history[self._history_start] = message
+            self._history_start = (self._history_start + 1) % HISTORY_MESSAGES
+        self.message_count += 1
+
+    def messages(self) -> List[tuple]:
+        """History as (role, content, timestamp) tuples, oldest first."""
+        return self._history[self._history_start:] + self._history[:self._history_start]
+
+    @property
+    def history_len(self) -> int:
+        """Number of messages held (at most HISTORY_MESSAGES)."""
+        return len(self._history)
+
+    def history_window(self, n: int) -> List[dict]:
+        """The last n messages as {"role", "content", "timestamp"} dicts, oldest first."""
+        size = len(self._history)
+        n = min(n, size)
+        if n <= 0:
+            return []
+        first = (self._history_start + size - n) % size
+        window = self._history[first:first + n]
+        if len(window) < n:
+            window += self._history[:n - len(window)]
+        return [
+            {"role": role, "content": content, "timestamp": timestamp}
+            for role, content, timestamp in window
+        ]
+
+    @property
+    def conversation_history(self) -> List[dict]:
+        """History as {"role", "content", "timestamp"} dicts, oldest first (a new list)."""
+        return [
+            {"role": role, "content": content, "timestamp": timestamp}
+            for role, content, timestamp in self.messages()
+        ]
+
+    def __getitem__(self, key: str):
+        if key == "conversation_history":
+            return self.conversation_history
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, **fields) -> None:
+        for key, value in fields.items():
+            if key not in self._FIELD_SET:
+                raise KeyError(key)
+            setattr(self, key, value)
+
+    def to_dict(self) -> dict:
+        """JSON-able form (for SESSION_BACKEND=sqlite)."""
+        data = {key: getattr(self, key) for key in self._FIELDS}
+        data["history"] = [list(message) for message in self.messages()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SessionRecord":
+        record = cls(data["session_id"], data["created_at"])
+        record.update(**{key: data[key] for key in cls._FIELDS})
+        record.user_type = sys.intern(record.user_type)
+        record._history = [(sys.intern(role), content, timestamp) for role, content, timestamp in data["history"]]
+        return record
 
 
 class SessionStore:
-    """In-memory session store for conversation state management."""
+    """
+    Conversation state for chat and voice sessions.
 
-    def __init__(self, timeout_minutes: int = 30):
-        self._sessions: dict = {}
+    Sessions live in a session backend (see session_backend.py), so with
+    SESSION_BACKEND=sqlite every worker sees the same sessions. Each read or
+    write restarts the idle timeout. Change sessions through this store,
+    never in place. Methods are async: SQLite reads and writes run in the
+    blocking executor, off the event loop.
+    """
+
+    NAMESPACE = "chat"
+
+    def __init__(self, backend=None, timeout_minutes: int = 30):
+        self._backend = backend or MemorySessionBackend()
+        self._backend.register_codec(self.NAMESPACE, SessionRecord.to_dict, SessionRecord.from_dict)
         self._timeout = timeout_minutes * 60  # convert to seconds
 
-    def create_session(self) -> str:
+    async def create_session(self) -> str:
         """Create a new guest session and return the session ID."""
-        session_id = str(uuid.uuid4())
-        self._sessions[session_id] = {
-            "session_id": session_id,
-            "user_type": "guest",  # "guest" or "registered"
-            "verified": False,
-            "patient_id": None,
-            "patient_name": None,
-            "patient_code": None,
-            "phone": None,
-            "conversation_history": [],
-            "created_at": time.time(),
-            "last_active": time.time(),
-        }
-        return session_id
-
-    def get_session(self, session_id: str) -> Optional[dict]:
-        """Get session by ID. Returns None if expired or not found."""
-        session = self._sessions.get(session_id)
-        if not session:
-            return None
+        return (await self._create()).session_id
 
-        # Check expiry
-        if time.time() - session["last_active"] > self._timeout:
-            self.delete_session(session_id)
-            return None
-
-        session["last_active"] = time.time()
-        return session
+    async def get_session(self, session_id: str) -> Optional[SessionRecord]:
+        """Get session by ID. Returns None if expired or not found."""
+        return await self._update(session_id)
 
-    def get_or_create_session(self, session_id: Optional[str] = None) -> dict:
+    async def get_or_create_session(self, session_id: Optional[str] = None) -> SessionRecord:
         """Get existing session or create a new one."""
         if session_id:
-            session = self.get_session(session_id)
+            session = await self.get_session(session_id)
             if session:
                 return session
 
-        new_id = self.create_session()
-        return self._sessions[new_id]
+        return await self._create()
 
-    def update_session(self, session_id: str, **kwargs):
-        """Update session fields."""
-        session = self._sessions.get(session_id)
-        if session:
-            session.update(kwargs)
-            session["last_active"] = time.time()
+    async def update_session(self, session_id: str, **kwargs) -> Optional[SessionRecord]:
+        """Update session fields; returns the updated session."""
+        return await self._update(session_id, lambda session: session.update(**kwargs))
 
-    def add_message(self, session_id: str, role: str, content: str):
-        """Add a message to the conversation history."""
-        session = self._sessions.get(session_id)
-        if session:
-            session["conversation_history"].append({
-                "role": role,
-                "content": content,
-                "timestamp": time.time(),
-            })
-            # Keep only last 20 turns to manage context size
-            if len(session["conversation_history"]) > 40:
-                session["conversation_history"] = session["conversation_history"][-40:]
-
-    def get_history(self, session_id: str) -> list:
+    async def add_message(self, session_id: str, role: str, content: str) -> Optional[SessionRecord]:
+        """Add a message to the conversation history; returns the updated session."""
+        timestamp = time.time()
+        return await self._update(session_id, lambda session: session.add_message(role, content, timestamp))
+
+    async def get_history(self, session_id: str) -> list:
         """Get conversation history for a session."""
-        session = self._sessions.get(session_id)
+        session = await call_backend(self._backend, "get", self.NAMESPACE, session_id)
         if session:
-            return session["conversation_history"]
+            return session.conversation_history
         return []
 
-    def upgrade_to_registered(
+    async def upgrade_to_registered(
         self,
         session_id: str,
         patient_id: int,
         patient_name: str,
         patient_code: str,
         phone: str,
-    ):
+    ) -> Optional[SessionRecord]:
         """Upgrade a guest session to a verified registered session."""
-        self.update_session(
-            session_id,
-            user_type="registered",
-            verified=True,
-            patient_id=patient_id,
-            patient_name=patient_name,
-            patient_code=patient_code,
-            phone=phone,
-        )
-
-    def delete_session(self, session_id: str):
+        def upgrade(session: SessionRecord):
+            session.update(
+                user_type="registered",
+                verified=True,
+                patient_id=patient_id,
+                patient_name=patient_name,
+                patient_code=patient_code,
+                phone=phone,
+                history_epoch=session.history_epoch + 1,
+            )
+
+        return await self._update(session_id, upgrade)
+
+    async def delete_session(self, session_id: str):
         """Delete a session."""
-        self._sessions.pop(session_id, None)
+        await call_backend(self._backend, "pop", self.NAMESPACE, session_id)
 
-    def cleanup_expired(self):
-        """Remove all expired sessions."""
-        now = time.time()
-        expired = [
-            sid for sid, s in self._sessions.items()
-            if now - s["last_active"] > self._timeout
-        ]
-        for sid in expired:
-            del self._sessions[sid]
+    async def cleanup_expired(self) -> int:
+        """Remove all expired sessions; returns how many."""
+        return await call_backend(self._backend, "purge_expired", self.NAMESPACE)
+
+    async def _create(self) -> SessionRecord:
+        session = SessionRecord(str(uuid.uuid4()))
+        await call_backend(self._backend, "set", self.NAMESPACE, session.session_id, session, self._timeout)
+        return session
+
+    async def _update(self, session_id: str, mutate=None) -> Optional[SessionRecord]:
+        """Atomically apply mutate (if any), mark the session active and restart its timeout."""
+        def touch(session: SessionRecord):
+            if mutate:
+                mutate(session)
+            session.last_active = time.time()
+
+        return await call_backend(self._backend, "update", self.NAMESPACE, session_id, touch, ttl_seconds=self._timeout)
 
 
 # Global session store instance
-session_store = SessionStore()
+session_store = SessionStore(session_backend, settings.SESSION_TIMEOUT_MINUTES)
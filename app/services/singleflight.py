@@ -0,0 +1,60 @@
+"""
+Single-flight — coalesces concurrent identical requests into one execution.
+
+The first caller for a key (the leader) runs the work; callers that arrive
+with the same key while it is in flight wait for the leader's result instead
+of starting their own. If the leader fails or is cancelled, waiting callers
+fall back to running the work themselves.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, Tuple, TypeVar
+from app.services.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Per-key in-flight call registry for a single event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run fn() once per concurrent key.
+
+        Returns (result, shared) — shared is True when the result came from
+        another caller's execution.
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                result = await asyncio.shield(pending)
+                metrics.increment(f"{self.name}_coalesced")
+                return result, True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this caller was cancelled, not the leader
+            except Exception:
+                pass
+            # Leader failed — do the work ourselves
+            return await fn(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        metrics.set_gauge(f"{self.name}_inflight", len(self._inflight))
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; followers re-run on failure
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            metrics.set_gauge(f"{self.name}_inflight", len(self._inflight))
@@ -1,50 +1,64 @@
 from sqlalchemy.orm import Session
+import asyncio
 import time
 import json
+from typing import Optional
+from app.database import SessionLocal
 from app.tools.doctor_schedule import search_doctors, get_department_info
 from app.tools.appointment import book_appointment, cancel_appointment, list_appointments
 from app.tools.reports import check_report_status
 from app.tools.billing import get_billing_summary
+from app.services.executors import blocking_executor
+from app.services.metrics import metrics
 from app.logger import logger
 
 
 # ── Tool Registry ────────────────────────────────────
-# Define which tools require authentication and their handlers
+# Define which tools require authentication and their handlers.
+# Read-only tools may run concurrently with each other; tools that write
+# run one at a time, in the order the LLM requested them.
 
 TOOL_REGISTRY = {
     "search_doctors": {
         "handler": "search_doctors",
         "requires_auth": False,
+        "read_only": True,
         "description": "Search for doctors",
     },
     "get_department_info": {
         "handler": "get_department_info",
         "requires_auth": False,
+        "read_only": True,
         "description": "Get department information",
     },
     "book_appointment": {
         "handler": "book_appointment",
         "requires_auth": True,
+        "read_only": False,
         "description": "Book an appointment",
     },
     "cancel_appointment": {
         "handler": "cancel_appointment",
         "requires_auth": True,
+        "read_only": False,
         "description": "Cancel an appointment",
     },
     "list_appointments": {
         "handler": "list_appointments",
         "requires_auth": True,
+        "read_only": True,
         "description": "List appointments",
     },
     "check_report_status": {
         "handler": "check_report_status",
         "requires_auth": True,
+        "read_only": True,
         "description": "Check lab report status",
     },
     "get_billing_summary": {
         "handler": "get_billing_summary",
         "requires_auth": True,
+        "read_only": True,
         "description": "Get billing summary",
     },
 }
@@ -53,6 +67,61 @@ TOOL_REGISTRY = {
 class ToolRouter:
     """Routes and executes tool calls from the LLM safely."""
 
+    async def execute_batch(self, tool_calls: list, session: dict, db: Session) -> list:
+        """
+        Execute a list of LLM tool calls off the event loop.
+
+        Consecutive read-only calls run concurrently, each on its own database
+        session; write calls run alone, so the requested order is preserved
+        wherever it can matter.
+
+        Returns a list of (tool_name, result) in the same order as tool_calls.
+        """
+        results = []
+        for group in self._group_calls(tool_calls):
+            if len(group) == 1:
+                results.append(await self._run_in_thread(group[0], session, db))
+            else:
+                results.extend(await asyncio.gather(*[
+                    self._run_in_thread(tc, session, None) for tc in group
+                ]))
+        return results
+
+    @staticmethod
+    def has_writes(tool_calls: list) -> bool:
+        """True if any call is not a registered read-only tool."""
+        return any(not TOOL_REGISTRY.get(tc["name"], {}).get("read_only", False) for tc in tool_calls)
+
+    def _group_calls(self, tool_calls: list) -> list:
+        """Split tool calls into runs of read-only calls and single write calls."""
+        groups = []
+        for tc in tool_calls:
+            read_only = TOOL_REGISTRY.get(tc["name"], {}).get("read_only", False)
+            if read_only and groups and groups[-1][0]:
+                groups[-1][1].append(tc)
+            else:
+                groups.append((read_only, [tc]))
+        return [calls for _, calls in groups]
+
+    async def _run_in_thread(self, tool_call: dict, session: dict, db: Optional[Session]) -> tuple:
+        """Run one tool call in the blocking executor; db=None opens a private DB session."""
+        tool_name = tool_call["name"]
+        tool_args = tool_call["args"]
+
+        def run():
+            own_db = db or SessionLocal()
+            try:
+                with metrics.timer(f"tool_{tool_name}_ms"):
+                    return self.execute(tool_name, tool_args, session, own_db)
+            finally:
+                if db is None:
+                    own_db.close()
+
+        logger.info(f"Executing tool: {tool_name} with args: {json.dumps(tool_args)}")
+        result = await blocking_executor.run(run)
+        logger.info(f"Tool result: {json.dumps(result, default=str)[:200]}...")
+        return tool_name, result
+
     def execute(self, tool_name: str, args: dict, session: dict, db: Session) -> dict:
         """
         Execute a tool call with audit logging.
@@ -0,0 +1,187 @@
+"""
+Vector stores — the dense half of FAQ retrieval.
+
+Chroma remains the persistent home of the chunk embeddings (see
+RAGService.initialize); these classes only answer nearest-neighbour queries:
+
+- ChromaVectorStore: queries the Chroma collection (HNSW).
+- NumpyVectorStore: holds every embedding in one normalised float32 matrix and
+  ranks with a single matrix-vector product. For small knowledge bases (well
+  under ~100k chunks) brute force beats HNSW and needs no index build.
+
+Selected with RAG_VECTOR_BACKEND ("chroma" or "numpy"). Each access level
+has its own store, so queries need no access filter; UnionVectorStore
+searches several at once.
+"""
+import heapq
+import math
+from typing import List, Optional, Tuple
+import numpy as np
+
+# (chunk_id, document, metadata, cosine similarity)
+VectorHit = Tuple[str, str, dict, float]
+
+
+class ChromaVectorStore:
+    """
+    Nearest-neighbour queries against the Chroma collection.
+
+    Args:
+        collection: The synced Chroma collection
+        ids: Chunk IDs of this index version; other chunks in the collection
+             (added or pending deletion by a concurrent sync) are ignored
+    """
+
+    name = "chroma"
+
+    def __init__(self, collection, ids: Optional[List[str]] = None):
+        self._collection = collection
+        self._ids = set(ids) if ids is not None else None
+
+    def query(self, embedding: List[float], n_results: int) -> List[VectorHit]:
+        """Top n_results chunks by cosine similarity, best first."""
+        count = self._collection.count()
+        if count == 0:
+            return []
+        results = self._collection.query(
+            query_embeddings=[embedding],
+            n_results=min(n_results, count),
+        )
+
+        hits = []
+        if results and results["documents"]:
+            for chunk_id, doc, metadata, distance in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+            ):
+                if self._ids is not None and chunk_id not in self._ids:
+                    continue
+                # ChromaDB returns distance; lower = more similar for cosine
+                hits.append((chunk_id, doc, metadata, max(0, 1 - distance)))
+        return hits
+
+    def similarity(self, chunk_ids: List[str], embedding: List[float]) -> dict:
+        """Cosine similarity of the query to specific chunks: {chunk_id: score}."""
+        stored = self._collection.get(ids=chunk_ids, include=["embeddings"])
+        return {
+            chunk_id: max(0, self._cosine(embedding, chunk_embedding))
+            for chunk_id, chunk_embedding in zip(stored["ids"], stored["embeddings"])
+        }
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids) if self._ids is not None else self._collection.count()
+
+
+class NumpyVectorStore:
+    """
+    Brute-force cosine search over a contiguous float32 matrix.
+
+    Args:
+        ids: Chunk IDs, one per row
+        documents: Chunk texts
+        metadatas: Chunk metadata
+        embeddings: One vector per chunk
+    """
+
+    name = "numpy"
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings):
+        self._ids = list(ids)
+        self._documents = list(documents)
+        self._metadatas = list(metadatas)
+        self._positions = {chunk_id: position for position, chunk_id in enumerate(self._ids)}
+
+        if self._ids:
+            matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(self._ids), -1))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._matrix = matrix / norms
+
+    @classmethod
+    def from_collection(cls, collection, ids: Optional[List[str]] = None) -> "NumpyVectorStore":
+        """Load the stored embeddings of `ids` (default: all chunks) from a Chroma collection."""
+        if ids is not None and not ids:
+            return cls([], [], [], [])
+        stored = collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        return cls(stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"])
+
+    def _normalized(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def query(self, embedding: List[float], n_results: int) -> List[VectorHit]:
+        """Top n_results chunks by cosine similarity, best first."""
+        if not self._ids:
+            return []
+        scores = self._matrix @ self._normalized(embedding)
+
+        n = min(n_results, len(self._ids))
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(self._ids) else np.arange(len(self._ids))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (self._ids[i], self._documents[i], self._metadatas[i], max(0.0, float(scores[i])))
+            for i in top
+        ]
+
+    def similarity(self, chunk_ids: List[str], embedding: List[float]) -> dict:
+        """Cosine similarity of the query to specific chunks: {chunk_id: score}."""
+        positions = [self._positions[chunk_id] for chunk_id in chunk_ids if chunk_id in self._positions]
+        if not positions:
+            return {}
+        scores = self._matrix[positions] @ self._normalized(embedding)
+        return {self._ids[p]: max(0.0, float(score)) for p, score in zip(positions, scores)}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class UnionVectorStore:
+    """
+    Searches several stores (one per access level) as one, merging by score.
+
+    Args:
+        stores: The partition stores; cosine scores are comparable across them
+    """
+
+    def __init__(self, stores: list):
+        self._stores = list(stores)
+        self.name = self._stores[0].name if self._stores else "union"
+
+    def query(self, embedding: List[float], n_results: int) -> List[VectorHit]:
+        """Top n_results chunks across all partitions, best first."""
+        hits = [hit for store in self._stores for hit in store.query(embedding, n_results)]
+        return heapq.nlargest(n_results, hits, key=lambda hit: hit[3])
+
+    def similarity(self, chunk_ids: List[str], embedding: List[float]) -> dict:
+        """Cosine similarity of the query to specific chunks: {chunk_id: score}."""
+        scores = {}
+        for store in self._stores:
+            remaining = [chunk_id for chunk_id in chunk_ids if chunk_id not in scores]
+            if not remaining:
+                break
+            scores.update(store.similarity(remaining, embedding))
+        return scores
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._stores)
+
+
+def create_vector_store(name: str, collection, ids: Optional[List[str]] = None):
+    """Build the vector store selected by name ("chroma" or "numpy") over the given chunks of a collection."""
+    if name == "chroma":
+        return ChromaVectorStore(collection, ids)
+    if name == "numpy":
+        return NumpyVectorStore.from_collection(collection, ids)
+    raise ValueError(f"Unknown RAG vector backend: {name!r} (expected 'chroma' or 'numpy')")
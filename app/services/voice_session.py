@@ -5,6 +5,9 @@ Tracks call-specific state for the voice conversation flow.
 import time
 from typing import Optional
 
+from app.config import settings
+from app.services.session_backend import MemorySessionBackend, call_backend, session_backend
+
 
 # Voice call states
 class CallState:
@@ -16,12 +19,21 @@ class CallState:
 
 
 class VoiceSessionStore:
-    """Manages voice call sessions, mapping Twilio CallSid to app sessions."""
+    """
+    Manages voice call sessions, mapping Twilio CallSid to app sessions.
+
+    Calls live in the shared session backend, so each Twilio webhook of a
+    call may land on any worker. Change sessions through this store only;
+    its methods are async, like SessionStore's.
+    """
 
-    def __init__(self):
-        self._sessions: dict[str, dict] = {}
+    NAMESPACE = "voice"
 
-    def create_session(self, call_sid: str, caller_number: str) -> dict:
+    def __init__(self, backend=None, ttl_seconds: int = 3600):
+        self._backend = backend or MemorySessionBackend()
+        self._ttl = ttl_seconds
+
+    async def create_session(self, call_sid: str, caller_number: str) -> dict:
         """Create a new voice session when a call comes in."""
         session = {
             "call_sid": call_sid,
@@ -37,60 +49,57 @@ class VoiceSessionStore:
             "last_active": time.time(),
             "turn_count": 0,
         }
-        self._sessions[call_sid] = session
+        await call_backend(self._backend, "set", self.NAMESPACE, call_sid, session, self._ttl)
         return session
 
-    def get_session(self, call_sid: str) -> Optional[dict]:
+    async def get_session(self, call_sid: str) -> Optional[dict]:
         """Get an existing voice session."""
-        session = self._sessions.get(call_sid)
-        if session:
-            session["last_active"] = time.time()
-        return session
+        return await self._update(call_sid)
 
-    def update_session(self, call_sid: str, **kwargs) -> Optional[dict]:
+    async def update_session(self, call_sid: str, **kwargs) -> Optional[dict]:
         """Update fields on an existing session."""
-        session = self._sessions.get(call_sid)
-        if not session:
-            return None
-        session.update(kwargs)
-        session["last_active"] = time.time()
-        return session
+        return await self._update(call_sid, lambda session: session.update(kwargs))
 
-    def set_state(self, call_sid: str, new_state: str) -> None:
+    async def set_state(self, call_sid: str, new_state: str) -> None:
         """Transition the call state."""
-        session = self._sessions.get(call_sid)
-        if session:
-            old_state = session["call_state"]
+        transition = {}
+
+        def set_state(session: dict):
+            transition["old"] = session["call_state"]
             session["call_state"] = new_state
-            print(f"  Voice state: {old_state} → {new_state} (call {call_sid[:8]}...)")
 
-    def increment_turn(self, call_sid: str) -> int:
+        if await self._update(call_sid, set_state):
+            print(f"  Voice state: {transition['old']} → {new_state} (call {call_sid[:8]}...)")
+
+    async def increment_turn(self, call_sid: str) -> int:
         """Increment and return the turn count."""
-        session = self._sessions.get(call_sid)
-        if session:
+        def increment(session: dict):
             session["turn_count"] += 1
-            return session["turn_count"]
-        return 0
 
-    def end_session(self, call_sid: str) -> Optional[dict]:
+        session = await self._update(call_sid, increment)
+        return session["turn_count"] if session else 0
+
+    async def end_session(self, call_sid: str) -> Optional[dict]:
         """Remove a completed call session."""
-        session = self._sessions.pop(call_sid, None)
+        session = await call_backend(self._backend, "pop", self.NAMESPACE, call_sid)
         if session:
             duration = time.time() - session["started_at"]
             print(f"  Call ended: {call_sid[:8]}... | Duration: {duration:.0f}s | Turns: {session['turn_count']}")
         return session
 
-    def cleanup_stale(self, max_age_seconds: int = 3600) -> int:
-        """Remove sessions older than max_age_seconds."""
-        now = time.time()
-        stale = [
-            sid for sid, s in self._sessions.items()
-            if now - s["last_active"] > max_age_seconds
-        ]
-        for sid in stale:
-            self._sessions.pop(sid, None)
-        return len(stale)
+    async def cleanup_stale(self) -> int:
+        """Remove sessions idle for longer than the TTL; returns how many."""
+        return await call_backend(self._backend, "purge_expired", self.NAMESPACE)
+
+    async def _update(self, call_sid: str, mutate=None) -> Optional[dict]:
+        """Atomically apply mutate (if any), mark the call active and restart its TTL."""
+        def touch(session: dict):
+            if mutate:
+                mutate(session)
+            session["last_active"] = time.time()
+
+        return await call_backend(self._backend, "update", self.NAMESPACE, call_sid, touch, ttl_seconds=self._ttl)
 
 
 # Global voice session store
-voice_session_store = VoiceSessionStore()
+voice_session_store = VoiceSessionStore(session_backend, settings.VOICE_SESSION_TTL_SECONDS)
@@ -0,0 +1,230 @@
+"""
+Benchmark RAG retrieval quality and latency against the real FAQ files.
+
+Builds a fresh index of FAQ_DIR in a temporary directory, runs a labelled
+query set (benchmarks/rag_queries.json) through RAGService.retrieve and
+reports:
+
+- quality: recall@k, hit rate@k and MRR over labelled queries, plus the mean
+  number of chunks returned for queries that should get no context
+- latency: p50/p95 retrieve() time, cold (query embedded) and warm (cached)
+- build: cold index build (every chunk embedded) and warm start (nothing to embed)
+- memory: peak RSS and Python allocations of a warm start (the in-process index)
+
+A result is relevant when it comes from the labelled file and its heading path
+contains the labelled heading, so labels survive chunking changes.
+
+Runs offline once the embedding model is cached. Save the JSON report and diff
+it between commits; --min-recall/--min-mrr exit non-zero below a threshold.
+
+Usage:
+    python -m benchmarks.rag_quality
+    python -m benchmarks.rag_quality --output before.json
+    python -m benchmarks.rag_quality --set RAG_CHUNK_MAX_TOKENS=120 --set RAG_VECTOR_BACKEND=numpy
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.config import settings
+from app.services.rag_service import RAGService
+
+DEFAULT_QUERIES = Path(__file__).resolve().parent / "rag_queries.json"
+
+
+def apply_overrides(overrides):
+    """Apply KEY=VALUE settings overrides, cast to the setting's type."""
+    for override in overrides:
+        key, _, value = override.partition("=")
+        if not hasattr(settings, key):
+            raise SystemExit(f"Unknown setting: {key}")
+        current = getattr(settings, key)
+        if isinstance(current, bool):
+            setattr(settings, key, value.lower() in ("1", "true", "yes", "on"))
+        else:
+            setattr(settings, key, type(current)(value))
+
+
+def disable_trimming():
+    """Return the raw ranking: no score threshold, elbow cut or token budget."""
+    settings.RAG_MIN_SCORE = 0.0
+    settings.RAG_ELBOW_MIN_GAP = float("inf")
+    settings.RAG_CONTEXT_MAX_TOKENS = 10 ** 9
+
+
+def is_relevant(result: dict, label: dict) -> bool:
+    heading_path = result["content"].split("\n", 1)[0]
+    return result["file"] == label["file"] and label["heading"].lower() in heading_path.lower()
+
+
+def percentiles(values):
+    values = sorted(values)
+    return {
+        "p50_ms": round(values[len(values) // 2], 3),
+        "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "mean_ms": round(statistics.mean(values), 3),
+    }
+
+
+def build_index(persist_dir: str):
+    """Start a RAGService on persist_dir; returns (service, milliseconds)."""
+    settings.CHROMA_PERSIST_DIR = persist_dir
+    service = RAGService()
+    start = time.perf_counter()
+    service.initialize()
+    return service, (time.perf_counter() - start) * 1000
+
+
+def evaluate(service: RAGService, labelled: list, k: int, access_level: str, repeat: int) -> dict:
+    cold, warm = [], []
+    per_query = []
+    for item in labelled:
+        start = time.perf_counter()
+        results = service.retrieve(item["query"], top_k=k, access_level=access_level)
+        cold.append((time.perf_counter() - start) * 1000)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            service.retrieve(item["query"], top_k=k, access_level=access_level)
+            warm.append((time.perf_counter() - start) * 1000)
+
+        ranks = [
+            next((rank for rank, result in enumerate(results, 1) if is_relevant(result, label)), None)
+            for label in item["relevant"]
+        ]
+        found = [rank for rank in ranks if rank is not None]
+        per_query.append({
+            "query": item["query"],
+            "returned": len(results),
+            "retrieval": results[0]["retrieval"] if results else None,
+            "ranks": ranks,
+            "first_relevant_rank": min(found) if found else None,
+            "recall": round(len(found) / len(ranks), 3) if ranks else None,
+        })
+
+    answerable = [q for q in per_query if q["recall"] is not None]
+    unanswerable = [q for q in per_query if q["recall"] is None]
+    quality = {
+        f"recall@{k}": round(statistics.mean(q["recall"] for q in answerable), 4) if answerable else None,
+        f"hit_rate@{k}": round(statistics.mean(q["first_relevant_rank"] is not None for q in answerable), 4) if answerable else None,
+        "mrr": round(statistics.mean(1 / q["first_relevant_rank"] if q["first_relevant_rank"] else 0.0 for q in answerable), 4) if answerable else None,
+        "mean_chunks_returned": round(statistics.mean(q["returned"] for q in per_query), 2),
+        "unanswerable_mean_chunks": round(statistics.mean(q["returned"] for q in unanswerable), 2) if unanswerable else None,
+        "answerable_queries": len(answerable),
+        "unanswerable_queries": len(unanswerable),
+    }
+    latency = {"cold": percentiles(cold), "warm": percentiles(warm) if warm else None}
+    return {"quality": quality, "latency": latency, "queries": per_query}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    labelled = json.loads(Path(args.queries).read_text(encoding="utf-8"))
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as persist_dir:
+        _, build_ms = build_index(persist_dir)
+
+        # A second service over the same store embeds nothing: this is the query-serving index
+        service, warm_start_ms = build_index(persist_dir)
+        report = evaluate(service, labelled, args.k, args.access_level, args.repeat)
+
+        tracemalloc.start()
+        traced, _ = build_index(persist_dir)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        chunks = len(traced._index.lexical["all"]) if traced._index else 0
+
+    return {
+        "revision": git_revision(),
+        "config": {
+            "faq_dir": settings.FAQ_DIR,
+            "k": args.k,
+            "access_level": args.access_level,
+            "trimming": not args.no_trim,
+            "vector_backend": settings.RAG_VECTOR_BACKEND,
+            "chunk_max_tokens": settings.RAG_CHUNK_MAX_TOKENS,
+            "chunk_overlap_tokens": settings.RAG_CHUNK_OVERLAP_TOKENS,
+            "overrides": args.set,
+        },
+        "build": {
+            "chunks": chunks,
+            "cold_ms": round(build_ms, 1),
+            "warm_start_ms": round(warm_start_ms, 1),
+        },
+        "memory": {
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "warm_start_traced_mb": round(traced_peak / 2 ** 20, 2),
+        },
+        **report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=str(DEFAULT_QUERIES), help="labelled query set (JSON)")
+    parser.add_argument("--faq-dir", default=None, help="FAQ directory (default FAQ_DIR)")
+    parser.add_argument("-k", type=int, default=settings.RAG_MAX_CONTEXT_CHUNKS)
+    parser.add_argument("--access-level", default="all", choices=("all", "public"))
+    parser.add_argument("--repeat", type=int, default=5, help="warm retrievals per query")
+    parser.add_argument("--no-trim", action="store_true", help="score the raw ranking, without context trimming")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a setting")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    parser.add_argument("--min-recall", type=float, help="exit 1 if recall@k is below this")
+    parser.add_argument("--min-mrr", type=float, help="exit 1 if MRR is below this")
+    args = parser.parse_args()
+
+    apply_overrides(args.set)
+    if args.faq_dir:
+        settings.FAQ_DIR = args.faq_dir
+    if args.no_trim:
+        disable_trimming()
+
+    report = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        quality, latency = report["quality"], report["latency"]
+        print(f"revision {report['revision']}  chunks {report['build']['chunks']}  k={args.k}  backend {settings.RAG_VECTOR_BACKEND}")
+        print(f"  recall@k {quality[f'recall@{args.k}']}  hit rate {quality[f'hit_rate@{args.k}']}  MRR {quality['mrr']}")
+        print(f"  chunks returned {quality['mean_chunks_returned']} (unanswerable: {quality['unanswerable_mean_chunks']})")
+        print(f"  latency cold p50 {latency['cold']['p50_ms']} ms / p95 {latency['cold']['p95_ms']} ms", end="")
+        if latency["warm"]:
+            print(f", warm p50 {latency['warm']['p50_ms']} ms / p95 {latency['warm']['p95_ms']} ms")
+        else:
+            print()
+        print(f"  build cold {report['build']['cold_ms']} ms, warm start {report['build']['warm_start_ms']} ms")
+        print(f"  memory peak RSS {report['memory']['peak_rss_mb']} MB, index {report['memory']['warm_start_traced_mb']} MB")
+        for query in report["queries"]:
+            if query["recall"] is not None and query["recall"] < 1:
+                print(f"  miss: {query['query']!r} ranks {query['ranks']}")
+
+    failed = []
+    quality = report["quality"]
+    if args.min_recall is not None and (quality[f"recall@{args.k}"] or 0) < args.min_recall:
+        failed.append(f"recall@{args.k} {quality[f'recall@{args.k}']} < {args.min_recall}")
+    if args.min_mrr is not None and (quality["mrr"] or 0) < args.min_mrr:
+        failed.append(f"MRR {quality['mrr']} < {args.min_mrr}")
+    if failed:
+        print("FAILED: " + "; ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
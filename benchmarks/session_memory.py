@@ -0,0 +1,162 @@
+"""
+Benchmark the memory held by idle chat sessions.
+
+Fills a SessionStore on the in-memory backend with N sessions carrying M
+messages each and reports the Python allocations per session (tracemalloc),
+next to the previous layout: a plain dict per session whose history was a
+list of message dicts, re-sliced once it passed 40 messages. Also times
+adding a message to a session whose history is full.
+
+Message contents are shared strings, so the numbers are the per-session
+overhead on top of the text itself.
+
+Usage:
+    python -m benchmarks.session_memory
+    python -m benchmarks.session_memory --sessions 100000 --messages 0 2 10 40
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+
+from app.services.session_backend import MemorySessionBackend
+from app.services.session_store import SessionRecord, SessionStore
+
+USER_MESSAGE = "What are the OPD timings for cardiology on Saturday?"
+ASSISTANT_MESSAGE = "Cardiology OPD runs 9 AM to 1 PM on Saturdays at Block B, first floor."
+
+
+def legacy_add_message(session: dict, role: str, content: str):
+    """The previous SessionStore.add_message, kept as the baseline."""
+    session["conversation_history"].append({
+        "role": role,
+        "content": content,
+        "timestamp": time.time(),
+    })
+    session["message_count"] += 1
+    if len(session["conversation_history"]) > 40:
+        session["conversation_history"] = session["conversation_history"][-40:]
+
+
+def fill_legacy(n_sessions: int, n_messages: int) -> dict:
+    sessions = {}
+    for _ in range(n_sessions):
+        session_id = str(uuid.uuid4())
+        session = sessions[session_id] = {
+            "session_id": session_id,
+            "user_type": "guest",
+            "verified": False,
+            "patient_id": None,
+            "patient_name": None,
+            "patient_code": None,
+            "phone": None,
+            "conversation_history": [],
+            "message_count": 0,
+            "history_epoch": 0,
+            "created_at": time.time(),
+            "last_active": time.time(),
+        }
+        for i in range(n_messages):
+            legacy_add_message(session, "user" if i % 2 == 0 else "assistant", USER_MESSAGE if i % 2 == 0 else ASSISTANT_MESSAGE)
+    return sessions
+
+
+async def _fill_store(n_sessions: int, n_messages: int) -> SessionStore:
+    store = SessionStore(MemorySessionBackend())
+    for _ in range(n_sessions):
+        session_id = await store.create_session()
+        for i in range(n_messages):
+            await store.add_message(session_id, "user" if i % 2 == 0 else "assistant", USER_MESSAGE if i % 2 == 0 else ASSISTANT_MESSAGE)
+    return store
+
+
+def fill_store(n_sessions: int, n_messages: int) -> SessionStore:
+    return asyncio.run(_fill_store(n_sessions, n_messages))
+
+
+def measure(fill, n_sessions: int, n_messages: int) -> dict:
+    """Bytes allocated per session by fill, and how long filling took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = fill(n_sessions, n_messages)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return {
+        "bytes_per_session": round(current / n_sessions),
+        "total_mb": round(current / 2 ** 20, 1),
+        "fill_s": round(elapsed, 2),
+    }
+
+
+def time_full_history_appends(n: int) -> dict:
+    """Microseconds per message once the history is at capacity."""
+    legacy = next(iter(fill_legacy(1, 40).values()))
+    start = time.perf_counter()
+    for i in range(n):
+        legacy_add_message(legacy, "user", USER_MESSAGE)
+    legacy_us = (time.perf_counter() - start) / n * 1e6
+
+    record = SessionRecord(str(uuid.uuid4()))
+    for i in range(40):
+        record.add_message("user", USER_MESSAGE, time.time())
+    start = time.perf_counter()
+    for i in range(n):
+        record.add_message("user", USER_MESSAGE, time.time())
+    record_us = (time.perf_counter() - start) / n * 1e6
+
+    # The full store call also takes the backend lock and restarts the session's TTL
+    async def time_store() -> float:
+        store = SessionStore(MemorySessionBackend())
+        session_id = await store.create_session()
+        for i in range(40):
+            await store.add_message(session_id, "user", USER_MESSAGE)
+        start = time.perf_counter()
+        for i in range(n):
+            await store.add_message(session_id, "user", USER_MESSAGE)
+        return (time.perf_counter() - start) / n * 1e6
+
+    store_us = asyncio.run(time_store())
+    return {"legacy_us": round(legacy_us, 2), "record_us": round(record_us, 2), "store_us": round(store_us, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, nargs="+", default=[0, 2, 40], help="messages per session")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = {"sessions": args.sessions, "layouts": []}
+    for n_messages in args.messages:
+        report["layouts"].append({
+            "messages": n_messages,
+            "legacy": measure(fill_legacy, args.sessions, n_messages),
+            "store": measure(fill_store, args.sessions, n_messages),
+        })
+    report["add_message_full_history"] = time_full_history_appends(20_000)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{args.sessions} sessions (in-memory backend, including expiry index)")
+    for row in report["layouts"]:
+        legacy, store = row["legacy"], row["store"]
+        print(
+            f"  {row['messages']:>3} messages: {store['bytes_per_session']:>6} B/session ({store['total_mb']} MB) "
+            f"vs {legacy['bytes_per_session']:>6} B/session ({legacy['total_mb']} MB) before"
+        )
+    appends = report["add_message_full_history"]
+    print(
+        f"  add_message at 40 messages: {appends['record_us']} µs vs {appends['legacy_us']} µs before "
+        f"({appends['store_us']} µs through the store, with TTL refresh)"
+    )
+
+
+if __name__ == "__main__":
+    main()
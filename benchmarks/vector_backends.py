@@ -0,0 +1,119 @@
+"""
+Benchmark the RAG vector backends: Chroma (HNSW) vs NumPy brute force.
+
+Uses random unit vectors shaped like the default embedding model's output
+(384 dims) and the same query set for both backends. Each access level has
+its own store in the app, so one unfiltered store is benchmarked per size.
+Reports build time, query latency, and how often HNSW returns the exact top-k.
+
+Usage:
+    python -m benchmarks.vector_backends --chunks 50 1000 10000 --queries 200
+"""
+import argparse
+import json
+import statistics
+import time
+
+import chromadb
+import numpy as np
+
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore
+
+DIMENSIONS = 384
+
+
+def make_corpus(n_chunks: int, rng: np.random.Generator):
+    embeddings = rng.standard_normal((n_chunks, DIMENSIONS)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"chunk_{i}" for i in range(n_chunks)]
+    documents = [f"document {i}" for i in range(n_chunks)]
+    metadatas = [{"access_level": "public"} for _ in range(n_chunks)]
+    return ids, documents, metadatas, embeddings
+
+
+def build_chroma(ids, documents, metadatas, embeddings) -> ChromaVectorStore:
+    client = chromadb.EphemeralClient(chromadb.Settings(anonymized_telemetry=False, allow_reset=True))
+    client.reset()
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+    batch = 1000
+    for i in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[i:i + batch],
+            documents=documents[i:i + batch],
+            metadatas=metadatas[i:i + batch],
+            embeddings=embeddings[i:i + batch].tolist(),
+        )
+    return ChromaVectorStore(collection)
+
+
+def time_queries(store, queries, top_k: int):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.query(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit[0] for hit in hits])
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+    }, results
+
+
+def run(n_chunks: int, n_queries: int, top_k: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    ids, documents, metadatas, embeddings = make_corpus(n_chunks, rng)
+    queries = [q.tolist() for q in rng.standard_normal((n_queries, DIMENSIONS)).astype(np.float32)]
+
+    start = time.perf_counter()
+    chroma = build_chroma(ids, documents, metadatas, embeddings)
+    chroma_build = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    numpy_store = NumpyVectorStore(ids, documents, metadatas, embeddings)
+    numpy_build = (time.perf_counter() - start) * 1000
+
+    chroma_stats, chroma_ids = time_queries(chroma, queries, top_k)
+    numpy_stats, exact_ids = time_queries(numpy_store, queries, top_k)
+    recall = statistics.mean(
+        len(set(approx) & set(exact)) / len(exact) for approx, exact in zip(chroma_ids, exact_ids) if exact
+    )
+    report = {
+        "chunks": n_chunks,
+        "queries": n_queries,
+        "top_k": top_k,
+        "chroma": chroma_stats,
+        "numpy": numpy_stats,
+        "speedup_p50": round(chroma_stats["p50_ms"] / max(numpy_stats["p50_ms"], 1e-6), 1),
+        "chroma_recall_at_k": round(recall, 3),
+        "build_ms": {"chroma": round(chroma_build, 1), "numpy": round(numpy_build, 1)},
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[50, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    reports = [run(n, args.queries, args.top_k, args.seed) for n in args.chunks]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    print(f"{'chunks':>8} {'chroma p50':>11} {'numpy p50':>10} {'speedup':>8} {'hnsw recall':>12}")
+    for report in reports:
+        print(
+            f"{report['chunks']:>8} {report['chroma']['p50_ms']:>9.3f}ms "
+            f"{report['numpy']['p50_ms']:>8.3f}ms {report['speedup_p50']:>7.1f}x {report['chroma_recall_at_k']:>12.3f}"
+        )
+        print(f"{'':>8} build: chroma {report['build_ms']['chroma']} ms, numpy {report['build_ms']['numpy']} ms")
+
+
+if __name__ == "__main__":
+    main()
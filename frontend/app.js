@@ -15,6 +15,8 @@ const state = {
     reconnectAttempts: 0,
     maxReconnectAttempts: 5,
     voiceMode: false,       // auto-read bot responses
+    streamingEl: null,      // bot message being filled by chat_chunk frames
+    streamingText: '',
 };
 
 // ── DOM References ─────────────────────────────────
@@ -289,9 +291,26 @@ function handleWSMessage(data) {
             updateSessionUI();
             break;
 
+        case 'chat_chunk':
+            hideTyping();
+            if (!state.streamingEl) {
+                state.streamingEl = addMessage('bot', '');
+                state.streamingText = '';
+            }
+            state.streamingText += data.delta;
+            state.streamingEl.querySelector('.message-bubble').innerHTML = formatMarkdown(state.streamingText);
+            scrollToBottom();
+            break;
+
         case 'chat_response':
             hideTyping();
             const msgEl = addMessage('bot', data.reply);
+            // Replace the streamed draft with the final (guardrailed) reply
+            if (state.streamingEl) {
+                state.streamingEl.replaceWith(msgEl);
+                state.streamingEl = null;
+                state.streamingText = '';
+            }
             state.userType = data.user_type;
             state.verified = data.verified;
             state.sessionId = data.session_id;
@@ -322,6 +341,8 @@ function handleWSMessage(data) {
 
         case 'error':
             hideTyping();
+            state.streamingEl = null;
+            state.streamingText = '';
             addSystemMessage(data.message || 'An error occurred.', 'error');
             break;
     }
@@ -345,6 +366,7 @@ function sendMessage(text) {
         type: 'chat',
         message: message,
         session_id: state.sessionId,
+        stream: true,
     }));
 
     // Clear input
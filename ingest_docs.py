@@ -0,0 +1,73 @@
+"""
+Bulk-index documents into the persistent RAG index (CHROMA_PERSIST_DIR).
+
+Indexes every Markdown, HTML and plain-text file under FAQ_DIR (public) and
+PRIVATE_DOCS_DIR (registered users), the same folders the app reads, so set
+those in .env first. Files are parsed and chunked in a process pool and
+embedded in batches, with progress printed as it goes.
+
+Run it while the app is stopped, e.g. before deploying a large policy export.
+The app's startup sync then finds every chunk already embedded. A running app
+picks up changes on its own (FAQ watcher) or via POST /admin/faqs/reload.
+
+Usage:
+    python ingest_docs.py
+    python ingest_docs.py --workers 8 --batch-size 512
+    python ingest_docs.py --full        # re-embed everything
+"""
+import argparse
+import sys
+import time
+
+from app.config import settings
+
+
+def print_progress(counters: dict) -> None:
+    rate = counters["embedded"] / counters["elapsed_s"] if counters["elapsed_s"] else 0.0
+    sys.stdout.write(
+        f"\r  {counters['files_done']}/{counters['files_total']} files, "
+        f"{counters['chunks']} chunks, {counters['embedded']} embedded ({rate:.0f} chunks/s)"
+    )
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="re-chunk and re-embed every document")
+    parser.add_argument("--workers", type=int, help="chunking processes (default RAG_INGEST_WORKERS)")
+    parser.add_argument("--batch-size", type=int, help="chunks per embedding batch (default RAG_EMBED_BATCH_SIZE)")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        settings.RAG_INGEST_WORKERS = args.workers
+    if args.batch_size is not None:
+        settings.RAG_EMBED_BATCH_SIZE = args.batch_size
+
+    from app.services.rag_service import rag_service
+
+    print("📚 Indexing documents")
+    print(f"   Public:  {settings.FAQ_DIR}")
+    print(f"   Private: {settings.PRIVATE_DOCS_DIR}")
+    print(f"   Index:   {settings.CHROMA_PERSIST_DIR}\n")
+
+    progress = None if args.quiet else print_progress
+    start = time.time()
+    # --full re-embeds everything below, so skip the incremental pass
+    rag_service.initialize(progress=progress, sync=not args.full)
+    summary = rag_service.sync(full=True, progress=progress) if args.full else None
+    if progress:
+        print()
+
+    elapsed = time.time() - start
+    if summary is None:
+        print(f"\n✅ Index up to date in {elapsed:.1f} s")
+    else:
+        print(
+            f"\n✅ Re-indexed in {elapsed:.1f} s: {summary['chunks']} chunks, "
+            f"{summary['embedded']} embedded, {summary['removed']} removed"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""OTP verification messages: never requested, expired, wrong code, success."""
+import asyncio
+import time
+
+from app.services.auth_service import AuthService
+from app.services.session_backend import MemorySessionBackend
+
+
+def test_expired_otp_is_reported_as_expired():
+    auth = AuthService(MemorySessionBackend(), otp_ttl_seconds=0.2)
+
+    async def run():
+        otp = await auth.generate_otp("9876543210")
+        time.sleep(0.25)   # past the OTP, not yet past the record (2 × TTL)
+        return await auth.verify_otp("9876543210", otp), await auth.verify_otp("9876543210", otp)
+
+    expired, again = asyncio.run(run())
+    assert expired == (False, "OTP has expired. Please request a new one.")
+    # Reported once; the expired code is then gone
+    assert again == (False, "No OTP was requested for this number. Please request a new OTP.")
+
+
+def test_otp_verifies_once():
+    auth = AuthService(MemorySessionBackend())
+
+    async def run():
+        otp = await auth.generate_otp("9876543210")
+        wrong = str((int(otp) + 1) % 1000000).zfill(6)
+        return [
+            await auth.verify_otp("9876543210", wrong),
+            await auth.verify_otp("9876543210", otp),
+            await auth.verify_otp("9876543210", otp),
+        ]
+
+    wrong, ok, reused = asyncio.run(run())
+    assert wrong == (False, "Invalid OTP. Please check and try again.")
+    assert ok == (True, "OTP verified successfully!")
+    assert not reused[0]
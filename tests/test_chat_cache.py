@@ -0,0 +1,40 @@
+"""Chat cache validity: a cached chat is reused only while it mirrors the session history."""
+import asyncio
+
+from app.services.chat_cache import CachedChat, ChatCache
+from app.services.session_backend import MemorySessionBackend
+from app.services.session_store import SessionStore
+
+
+def cached_turn(store, cache):
+    """Run one user/assistant exchange and check the chat in, as the orchestrator does."""
+    async def run():
+        session_id = await store.create_session()
+        await store.add_message(session_id, "user", "What are the OPD timings?")
+        session = await store.add_message(session_id, "assistant", "9 AM to 5 PM.")
+        cache.checkin(CachedChat(session_id, chat=object(), epoch=session.history_epoch,
+                                 message_count=session.message_count, window_len=session.history_len))
+        return session_id
+    return asyncio.run(run())
+
+
+def test_chat_is_reused_on_the_next_turn():
+    store, cache = SessionStore(MemorySessionBackend()), ChatCache()
+    session_id = cached_turn(store, cache)
+    session = asyncio.run(store.add_message(session_id, "user", "And on Sunday?"))
+    assert cache.checkout(session) is not None
+
+
+def test_history_epoch_change_invalidates_the_chat():
+    store, cache = SessionStore(MemorySessionBackend()), ChatCache()
+    session_id = cached_turn(store, cache)
+
+    async def log_in_then_ask():
+        # Verifying bumps history_epoch: the chat was built for a guest
+        await store.upgrade_to_registered(session_id, 1, "Amit Kumar", "CGH-10001", "9876543210")
+        return await store.add_message(session_id, "user", "Show my appointments")
+
+    session = asyncio.run(log_in_then_ask())
+    assert session.history_epoch == 1
+    assert cache.checkout(session) is None
+    assert len(cache) == 0
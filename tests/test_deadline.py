@@ -0,0 +1,67 @@
+"""Budgeted requests: the holding answer goes out before the deadline, and write tools are never abandoned."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.deadline import Deadline
+from app.services.orchestrator import Orchestrator, _SKIPPED_TOOL_RESULT
+from app.services.tool_router import tool_router
+
+
+@pytest.fixture(autouse=True)
+def short_margins(monkeypatch):
+    monkeypatch.setattr(settings, "DEADLINE_HOLDING_MARGIN_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "DEADLINE_LLM_RESERVE_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "DEADLINE_WRITE_TOOL_SECONDS", 0.5)
+
+
+def slow(seconds, deadline=None):
+    async def produce():
+        if deadline is not None:
+            deadline.commit()
+        await asyncio.sleep(seconds)
+        return {"reply": "done"}, False
+    return produce
+
+
+def test_holding_answer_is_due_before_the_deadline():
+    deadline = Deadline(0.3)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(Orchestrator._produce_within(slow(1.0), deadline))
+    assert not deadline.expired
+
+
+def test_committed_request_finishes_past_the_deadline():
+    deadline = Deadline(0.2)
+    result, _ = asyncio.run(Orchestrator._produce_within(slow(0.4, deadline), deadline))
+    assert result["reply"] == "done"
+    assert deadline.expired
+
+
+def test_write_tool_is_not_started_without_budget(monkeypatch):
+    executed, sent = [], []
+
+    async def execute_batch(tool_calls, session, db):
+        executed.append(tool_calls)
+        return [(tc["name"], {"success": True}) for tc in tool_calls]
+
+    async def tool_result_llm(self, results, *args, **kwargs):
+        sent.append(results)
+        return {"response": "Not booked yet.", "tool_calls": []}
+
+    monkeypatch.setattr(tool_router, "execute_batch", execute_batch)
+    monkeypatch.setattr(Orchestrator, "_tool_result_llm", tool_result_llm)
+    calls = [{"name": "book_appointment", "args": {"doctor_name": "Dr. Rao"}}]
+
+    deadline = Deadline(0.3)   # less than DEADLINE_WRITE_TOOL_SECONDS left
+    reply = asyncio.run(Orchestrator()._handle_tool_calls(calls, {"verified": True}, None, [], deadline=deadline))
+    assert reply == "Not booked yet."
+    assert executed == []
+    assert sent == [[("book_appointment", _SKIPPED_TOOL_RESULT)]]
+    assert not deadline.committed
+
+    deadline = Deadline(2.0)
+    asyncio.run(Orchestrator()._handle_tool_calls(calls, {"verified": True}, None, [], deadline=deadline))
+    assert executed == [calls]
+    assert deadline.committed
@@ -0,0 +1,47 @@
+"""LLM retry classification: only rate-limit / transient errors are retried, matched by type."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.llm_backends.fake import FakeBackend, FakeLLMError
+from app.services.llm_service import LLMService
+from app.services.rate_governor import is_retryable_error, llm_governor
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SECONDS", 0.0)
+    llm_governor.breaker.record_success()
+
+
+def failing_send(error, calls):
+    def send(message):
+        calls.append(message)
+        raise error
+    return send
+
+
+def test_errors_are_classified_by_type_not_message():
+    # Messages that contain "rate", "limit", "internal" or "timeout" are not enough
+    assert not is_retryable_error(ValueError("failed to generate"))
+    assert not is_retryable_error(RuntimeError("internal error: iterate over limit"))
+    assert not is_retryable_error(ValueError("429 rate limit timeout"))
+    assert is_retryable_error(FakeLLMError("quota"), FakeBackend.retryable_errors)
+    assert is_retryable_error(asyncio.TimeoutError())
+
+
+def test_unrelated_error_is_not_retried():
+    service = LLMService(backend=FakeBackend())
+    calls = []
+    with pytest.raises(ValueError):
+        asyncio.run(service._call(failing_send(ValueError("failed to generate"), calls), "hi", est_tokens=10))
+    assert len(calls) == 1
+
+
+def test_backend_rate_limit_error_is_retried():
+    service = LLMService(backend=FakeBackend())
+    calls = []
+    with pytest.raises(FakeLLMError):
+        asyncio.run(service._call(failing_send(FakeLLMError("429"), calls), "hi", est_tokens=10))
+    assert len(calls) == settings.LLM_MAX_RETRIES
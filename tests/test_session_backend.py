@@ -0,0 +1,67 @@
+"""SQLite session backend under concurrent writers (one SessionStore per simulated worker)."""
+import asyncio
+import sqlite3
+import time
+
+from app.services.auth_service import AuthService
+from app.services.session_backend import SQLiteSessionBackend
+from app.services.session_store import SessionStore
+
+
+def worker_stores(path, n):
+    # Separate backends have separate connections, so they contend for the write lock like worker processes
+    return [SessionStore(SQLiteSessionBackend(str(path))) for _ in range(n)]
+
+
+def test_concurrent_writers_lose_no_messages(tmp_path):
+    stores = worker_stores(tmp_path / "sessions.db", 3)
+
+    async def run():
+        session_id = await stores[0].create_session()
+        await asyncio.gather(*(
+            stores[i % len(stores)].add_message(session_id, "user", f"message {i}")
+            for i in range(60)
+        ))
+        return await stores[1].get_session(session_id)
+
+    session = asyncio.run(run())
+    assert session.message_count == 60
+    assert session.history_len == 40
+
+
+def test_waiting_on_the_write_lock_does_not_block_the_event_loop(tmp_path):
+    path = tmp_path / "sessions.db"
+    store = worker_stores(path, 1)[0]
+
+    async def run():
+        session_id = await store.create_session()
+        other_worker = sqlite3.connect(str(path), isolation_level=None)
+        other_worker.execute("BEGIN IMMEDIATE")
+        write = asyncio.create_task(store.add_message(session_id, "user", "hello"))
+
+        ticks = 0
+        start = time.monotonic()
+        while time.monotonic() - start < 0.3:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not write.done()   # still waiting for the lock, in the executor
+
+        other_worker.execute("COMMIT")
+        other_worker.close()
+        return ticks, await write
+
+    ticks, session = asyncio.run(run())
+    assert ticks >= 10
+    assert session.message_count == 1
+
+
+def test_otp_is_verified_once_across_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    workers = [AuthService(SQLiteSessionBackend(path)) for _ in range(4)]
+
+    async def run():
+        otp = await workers[0].generate_otp("9876543210")
+        return await asyncio.gather(*(worker.verify_otp("9876543210", otp) for worker in workers))
+
+    results = asyncio.run(run())
+    assert [success for success, _ in results].count(True) == 1